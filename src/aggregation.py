@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import math
+import logging
+
+from datetime import datetime, timedelta
+from storage import to_float
+
+registro = logging.getLogger(__name__)
+
+DAY = 24 * 3600
+
+
+class Stats:
+    """Estadísticos acumulados de un canal en una ventana, actualizados en
+    O(1) por muestra con el algoritmo de Welford."""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class Aggregator:
+    """Promedios móviles por canal de un analizador en ventanas fijas.
+
+    Cada período (en segundos, divisor de un día) define ventanas alineadas
+    a la hora local, por ejemplo 60, 600 y 3600 para promedios minutales, de
+    diez minutos y horarios. Todas las muestras válidas se acumulan en la
+    ventana abierta de cada período y, cuando llega una muestra o un tick de
+    una ventana posterior, la ventana anterior se cierra y se devuelve con
+    su resumen.
+    """
+
+    def __init__(self, columns, periods=(60, 600, 3600)) -> None:
+        for period in periods:
+            if not self.valid_period(period):
+                raise ValueError(f"El período {period} no divide un día en ventanas")
+        self.columns = tuple(columns)
+        self.periods = tuple(periods)
+        self._windows = {period: None for period in self.periods}
+        self._stats = {period: {} for period in self.periods}
+        self.header = '"Fecha","Hora"' + "".join(
+            f',"{c}","{c}_min","{c}_max","{c}_std","{c}_n"' for c in self.columns
+        )
+        self._row_format = '"%04d-%02d-%02d","%02d:%02d:%02d"' + (
+            ',"%s","%s","%s","%s","%d"' * len(self.columns)
+        )
+
+    @staticmethod
+    def valid_period(period) -> bool:
+        """Un período sirve si es un número entero de segundos que divide
+        un día, así las ventanas quedan alineadas a la medianoche."""
+        return isinstance(period, int) and period > 0 and DAY % period == 0
+
+    def add(self, values: dict, fecha: datetime) -> list:
+        """Acumula una muestra y devuelve las ventanas que se cerraron como
+        tuplas (período, inicio, {canal: Stats}). Con values vacío solo cierra
+        las ventanas vencidas."""
+        cerradas = self.tick(fecha)
+        for period in self.periods:
+            stats = self._stats[period]
+            for column, value in values.items():
+                value = to_float(value)
+                if math.isnan(value):
+                    continue
+                if column not in stats:
+                    stats[column] = Stats()
+                stats[column].add(value)
+        return cerradas
+
+    def add_many(self, samples: list) -> list:
+        """Acumula una tanda de muestras (values, fecha) en orden y devuelve
+        todas las ventanas que se cerraron en el recorrido."""
+        cerradas = []
+        for values, fecha in samples:
+            cerradas += self.add(values, fecha)
+        return cerradas
+
+    def tick(self, fecha: datetime) -> list:
+        cerradas = []
+        dia = fecha.replace(hour=0, minute=0, second=0, microsecond=0)
+        segundos = fecha.hour * 3600 + fecha.minute * 60 + fecha.second
+        for period in self.periods:
+            ventana = dia + timedelta(seconds=segundos // period * period)
+            anterior = self._windows[period]
+            if anterior is not None and ventana < anterior:
+                # Muestra atrasada: se suma a la ventana en curso.
+                continue
+            if anterior is not None and ventana != anterior:
+                if self._stats[period]:
+                    cerradas.append((period, anterior, self._stats[period]))
+                self._stats[period] = {}
+            self._windows[period] = ventana
+        return cerradas
+
+    @staticmethod
+    def means(stats: dict) -> dict:
+        return {column: round(s.mean, 4) for column, s in stats.items()}
+
+    def serialize(self, stats: dict, fecha: datetime) -> str:
+        campos = []
+        for column in self.columns:
+            s = stats.get(column)
+            if s is None:
+                campos += ["NA", "NA", "NA", "NA", 0]
+            else:
+                campos += ["%.6g" % s.mean, "%.6g" % s.min, "%.6g" % s.max]
+                campos += ["%.6g" % s.std, s.count]
+        return self._row_format % (
+            fecha.year,
+            fecha.month,
+            fecha.day,
+            fecha.hour,
+            fecha.minute,
+            fecha.second,
+            *campos,
+        )
@@ -27,17 +27,36 @@
 # SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
 ##################################################################################################
 
-import os
-import shutil
-import socket
+import math
 import serial
-import time
 import logging
 import threading
-from datetime import datetime
-from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import deque
+from itertools import groupby
+from datetime import datetime, timedelta
 from urllib.parse import urlparse, parse_qs
 
+from webserver import HttpServer
+from readings import Reading
+from storage import CsvWriter, BinaryWriter, read_range
+from readers import (
+    BacklogMetrics,
+    FrameBuffer,
+    IOLoop,
+    LineFramer,
+    SerialReader,
+    TcpLink,
+)
+
+# Tamaño de los bloques en que se drena el rezago del puerto serie y largo
+# máximo de una trama sin fin de línea antes de descartarla.
+TAIL_CHUNK = 4096
+TAIL_MAX_LINE = 4096
+
+# Diferencia máxima entre el reloj de un equipo y el del datalogger para
+# usar la fecha de la trama como ancla del instante de recepción.
+FRAME_CLOCK_SKEW = 300
+
 STX = b"\x02"
 ETX = b"\x03"
 ACK = b"\x06"
@@ -57,8 +76,24 @@ def _status_valido(campo: str) -> bool:
     return digitos[-2:].upper() == "00" if len(digitos) >= 2 else False
 
 
+def _ultima_trama(cola: bytearray):
+    """Busca hacia atrás los dos últimos fines de línea y devuelve los
+    límites (inicio, fin) de la última trama completa que no esté vacía."""
+    fin = cola.rfind(b"\n")
+    while fin >= 0:
+        inicio = cola.rfind(b"\n", 0, fin) + 1
+        if cola[inicio:fin].strip():
+            return inicio, fin
+        fin = inicio - 1
+    return None
+
+
 class Analyzer:
     COLUMNS = None
+    FRAME_TIME = None
+    BATCH = False
+    PUSH = False
+    ingest = "latest"
 
     def __init__(
         self,
@@ -67,9 +102,17 @@ class Analyzer:
         publisher: callable,
         topic: str,
         simulated=False,
+        background=False,
+        frames=8,
+        ingest="latest",
     ) -> None:
         self._name = name
         self._simulated = simulated
+        self.ingest = ingest
+        self._reader = None
+        self._tail = bytearray()
+        self._framer = LineFramer(b"\n", max_size=TAIL_MAX_LINE)
+        self.backlog = BacklogMetrics()
         try:
             self._puerto = serial.Serial(
                 port=port,
@@ -82,10 +125,28 @@ class Analyzer:
                 self._puerto = None
         self._publisher = publisher
         self._topic = topic
+        self._init_storage()
+        self.respuesta = ""
+
+        # Modo opcional para los equipos que transmiten solos: un hilo lee el
+        # puerto en forma continua y el poll solo toma la última trama.
+        if background and not self._simulated and self._puerto:
+            self._reader = SerialReader(self._puerto, self._name, size=frames)
+            self._reader.start()
+
+    def _init_storage(self):
         self.dir = ""
         self._last_data = None
         self.filter_data = 0
-        self.respuesta = ""
+        self.flush_rows = 1
+        self.flush_interval = 0
+        self.storage_format = "csv"
+        self.index_interval = 600
+        self.compressor = None
+        self.aggregator = None
+        self.stream = None
+        self._writer = None
+        self._aggregate_writers = {}
 
     @property
     def name(self) -> str:
@@ -95,62 +156,154 @@ class Analyzer:
     def topic(self) -> str:
         return self._topic
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # La plantilla de cada fila se arma una sola vez por clase, con la
+        # fecha descompuesta en campos numéricos y un campo por cada entrada
+        # de COLUMNS: serializar es una única operación de formato, sin
+        # strftime ni concatenaciones columna por columna.
+        if cls.COLUMNS:
+            cls._HEADER = '"Fecha","Hora"' + "".join(f',"{c}"' for c in cls.COLUMNS)
+            cls._ROW_FORMAT = '"%04d-%02d-%02d","%02d:%02d:%02d"' + ',"%s"' * len(
+                cls.COLUMNS
+            )
+
     def _get_header(self):
-        result = '"Fecha","Hora"'
-        for column in self.COLUMNS:
-            result = result + f',"{column}"'
-        return result
-
-    def _serialize_values(self, values) -> str:
-        result = datetime.strftime(datetime.now(), '"%Y-%m-%d","%H:%M:%S"')
-        for column in self.COLUMNS:
-            result = result + f',"{values[column]}"'
-        return result
-
-    def logfile(self):
-        filename = f"{self.name}.csv"
-        new = not os.path.isfile(f"{self.name}.csv")
-        if not new and self._last_data:
-            published = (
-                f"{self.name}-{self._last_data.year}-{self._last_data.month}.csv"
+        return self._HEADER
+
+    def _serialize_values(self, values, fecha: datetime) -> str:
+        get = values.get
+        return self._ROW_FORMAT % (
+            fecha.year,
+            fecha.month,
+            fecha.day,
+            fecha.hour,
+            fecha.minute,
+            fecha.second,
+            *[get(column, "NA") for column in self.COLUMNS],
+        )
+
+    def _get_writer(self):
+        if self._writer is None and self.storage_format == "binary":
+            self._writer = BinaryWriter(
+                self.name,
+                self.COLUMNS,
+                dir=self.dir,
+                flush_rows=self.flush_rows,
+                flush_interval=self.flush_interval,
             )
-            if not os.path.exists(self.dir):
-                os.mkdir(self.dir)
-            if self._last_data.month != datetime.now().month:
-                registro.debug(f"Rotando el archivo de log por cambio de mes")
-                os.rename(filename, f"{self.dir}/{published}")
-                new = True
-            elif self._last_data.day != datetime.now().day:
-                registro.debug(f"Publicando el archivo de log por cambio de dia")
-                shutil.copy(filename, f"{self.dir}/{published}")
-
-        file = open(filename, "a+")
-        if new:
-            file.write(f"{self._get_header()}\r\n")
-        return file
+        elif self._writer is None:
+            self._writer = CsvWriter(
+                self.name,
+                self._get_header(),
+                self._serialize_values,
+                dir=self.dir,
+                flush_rows=self.flush_rows,
+                flush_interval=self.flush_interval,
+                index_interval=self.index_interval,
+                compressor=self.compressor,
+            )
+        return self._writer
 
     def log(self, values: dict):
-        registro.debug(f"Ultimo dato {self._last_data} y fecha actual {datetime.now()}")
+        ahora = datetime.now()
+        registro.debug(f"Ultimo dato {self._last_data} y fecha actual {ahora}")
         if self._last_data:
-            seconds = (datetime.now() - self._last_data).total_seconds()
+            seconds = (ahora - self._last_data).total_seconds()
         else:
             seconds = self.filter_data
         registro.debug(f"Delta {seconds} y filter {self.filter_data}")
 
         if seconds >= self.filter_data:
             if self.dir:
-                with self.logfile() as archivo:
-                    archivo.write(f"{self._serialize_values(values)}\r\n")
-                    archivo.close()
-                # print(f"{self._last_data} => {data}")
+                self._get_writer().write(values, ahora)
                 registro.debug(f"Escribiendo valores en el archivo de log")
             else:
                 registro.debug(f"No hay un archivo de log asignado")
-            self._last_data = datetime.now()
+            self._last_data = ahora
         else:
             registro.info(f"Los datos no se almacenan por las reglas de filtrado")
 
+    def log_many(self, batch: list):
+        """Almacena una tanda de muestras (values, fecha) en orden, aplicando
+        el filtrado sobre la fecha de cada una, con una sola escritura."""
+        filas = []
+        for values, fecha in batch:
+            if self._last_data:
+                seconds = (fecha - self._last_data).total_seconds()
+                if seconds < self.filter_data:
+                    continue
+            filas.append((values, fecha))
+            self._last_data = fecha
+
+        registro.debug(f"Almacenando {len(filas)} de {len(batch)} muestras")
+        if filas and self.dir:
+            self._get_writer().write_many(filas)
+
+    def log_aggregate(self, period: int, stats: dict, inicio: datetime):
+        if not self.dir:
+            return
+        writer = self._aggregate_writers.get(period)
+        if writer is None:
+            writer = CsvWriter(
+                f"{self.name}-{period}s",
+                self.aggregator.header,
+                self.aggregator.serialize,
+                dir=self.dir,
+                flush_rows=self.flush_rows,
+                flush_interval=self.flush_interval,
+                index_interval=self.index_interval,
+                compressor=self.compressor,
+            )
+            self._aggregate_writers[period] = writer
+        writer.write(stats, inicio)
+
+    def read_range(self, start: datetime, end: datetime):
+        if self._writer is not None:
+            self._writer.flush()
+        return read_range(self.dir, self.name, start, end)
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+        # El hilo de poll puede abrir el writer de un período nuevo mientras
+        # el mantenimiento recorre los existentes.
+        for writer in list(self._aggregate_writers.values()):
+            writer.flush()
+
+    def flush_due(self):
+        if self._writer is not None:
+            self._writer.flush_due()
+        for writer in list(self._aggregate_writers.values()):
+            writer.flush_due()
+
+    @property
+    def push(self) -> bool:
+        """Verdadero si el equipo transmite solo: un poll vacío significa que
+        no llegó nada desde el anterior, no que el equipo no responda."""
+        return self.PUSH or getattr(self, "_reader", None) is not None
+
+    def attach(self, loop):
+        """Pasa la lectura continua del equipo al IOLoop compartido; los
+        equipos que no transmiten solos siguen leyéndose en el poll."""
+        if getattr(self, "_reader", None) is not None:
+            self._reader.attach(loop)
+
+    def close(self):
+        if getattr(self, "_reader", None) is not None:
+            self._reader.stop()
+            self._reader = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        for writer in list(self._aggregate_writers.values()):
+            writer.close()
+        self._aggregate_writers = {}
+
     def poll(self) -> dict:
+        if self.ingest == "all" and self.BATCH:
+            return self._poll_batch()
+
         registro.debug(f"Obteniendo valores del analizador {self.name}")
         values = self._get_values()
 
@@ -159,15 +312,144 @@ class Analyzer:
                 f"Se obtuvieron los siguiente valores del analizador {self.name} {values}"
             )
             self.log(values)
+            if self.stream is not None:
+                self.stream(self, values, datetime.now())
+
+            if self._publisher and self.aggregator is None:
+                registro.info(f"Publicando valores del analizador {self.name}")
+                self._publisher(topic=self.topic, values=values)
+        else:
+            registro.warning(f"No se obtuvieron los valores del analizador {self.name}")
 
-            if self._publisher:
+        if self.aggregator is not None:
+            self._aggregate(values or {})
+
+        return values
+
+    def _poll_batch(self) -> dict:
+        """Variante de poll() que ingiere todas las tramas completas del
+        rezago en lugar de solo la última: cada una se fecha con su
+        recepción, anclada al minuto del equipo, y la tanda entera pasa de
+        una vez al almacenamiento y al agregador. Se publica el resumen de la tanda,
+        por omisión la más reciente."""
+        registro.debug(f"Obteniendo todas las tramas del analizador {self.name}")
+        batch = self._get_batch()
+        values = self._summarize(batch)
+
+        if batch:
+            registro.info(
+                f"Se obtuvieron {len(batch)} tramas del analizador {self.name}, resumen {values}"
+            )
+            self.log_many(batch)
+            if self.stream is not None:
+                for muestra, fecha in batch:
+                    self.stream(self, muestra, fecha)
+
+            if self._publisher and self.aggregator is None:
                 registro.info(f"Publicando valores del analizador {self.name}")
                 self._publisher(topic=self.topic, values=values)
         else:
             registro.warning(f"No se obtuvieron los valores del analizador {self.name}")
 
+        if self.aggregator is not None:
+            cerradas = self.aggregator.add_many(batch)
+            self._close_windows(cerradas + self.aggregator.tick(datetime.now()))
+
         return values
 
+    def _summarize(self, batch: list) -> dict:
+        return batch[-1][0] if batch else {}
+
+    def _get_batch(self) -> list:
+        tramas = []
+        for recibido, texto in self._read_serial_frames():
+            values = self._parse_frame(texto)
+            if values:
+                tramas.append((values, recibido, self._frame_minute(texto, recibido)))
+        batch = []
+        for (recibido, minuto), grupo in groupby(tramas, key=lambda t: t[1:]):
+            grupo = [values for values, _, _ in grupo]
+            batch += zip(grupo, self._frame_times(recibido, minuto, len(grupo)))
+        return batch
+
+    def _frame_minute(self, texto: str, recibido: datetime) -> datetime:
+        """Minuto que informa el equipo en la trama, o None si no es válido
+        o se aparta más de FRAME_CLOCK_SKEW del reloj local."""
+        try:
+            minuto = datetime.strptime(texto[:14], self.FRAME_TIME)
+        except ValueError:
+            return None
+        if abs((recibido - minuto).total_seconds()) > FRAME_CLOCK_SKEW:
+            return None
+        return minuto
+
+    @staticmethod
+    def _frame_times(recibido: datetime, minuto: datetime, cantidad: int) -> list:
+        """Fechas de las tramas que llegaron juntas en el mismo bloque leído.
+
+        Cada trama se fecha con su recepción. El minuto del equipo, de
+        resolución gruesa, solo sirve de ancla: si las tramas se recibieron
+        dentro de ese minuto se reparten entre su comienzo y la recepción,
+        terminando en ella, y si se recibieron después es que esperaron en
+        el buffer y se reparten a lo largo del minuto. Así varias tramas del
+        mismo minuto no comparten la fecha y el filtrado no las descarta.
+        """
+        if minuto is None:
+            return [recibido] * cantidad
+        if recibido < minuto + timedelta(minutes=1):
+            paso = (recibido - minuto) / cantidad
+            return [recibido - paso * (cantidad - 1 - i) for i in range(cantidad)]
+        paso = timedelta(minutes=1) / cantidad
+        return [minuto + paso * i for i in range(cantidad)]
+
+    def _read_serial_frames(self) -> list:
+        """Devuelve todas las tramas completas recibidas desde el poll
+        anterior como pares (recepción, texto), sin esperar al equipo. Una
+        trama parcial queda en el buffer para completarse en el próximo."""
+        if self._reader is not None:
+            return self._reader.frames()
+        if not self._puerto:
+            return []
+        tramas = []
+        try:
+            while self._puerto.in_waiting:
+                chunk = self._puerto.read(min(self._puerto.in_waiting, TAIL_CHUNK))
+                if not chunk:
+                    break
+                recibido = datetime.now()
+                self._framer.feed(chunk)
+                for linea in self._framer.lines():
+                    texto = linea.decode(errors="ignore").strip()
+                    if texto:
+                        tramas.append((recibido, texto))
+        except Exception as error:
+            registro.error(
+                f"No se pudo leer desde el puerto {self._puerto.port}, error {error}"
+            )
+        return tramas
+
+    def _aggregate(self, values: dict):
+        """Acumula la muestra en las ventanas del agregador y almacena cada
+        ventana cerrada; los promedios del período más corto son los que se
+        publican en lugar de las muestras individuales."""
+        self._close_windows(self.aggregator.add(values, datetime.now()))
+
+    def _close_windows(self, cerradas: list):
+        for period, inicio, stats in cerradas:
+            registro.debug(
+                f"Cerrando la ventana de {period}s del analizador {self.name} {inicio}"
+            )
+            self.log_aggregate(period, stats, inicio)
+            if self._publisher and period == self.aggregator.periods[0]:
+                self._publisher(topic=self.topic, values=self.aggregator.means(stats))
+
+    def _reading(self, texto: str, unit: str = "", status: str = ""):
+        try:
+            return Reading.parse(texto, unit, status)
+        except ValueError:
+            registro.warning(f"{self.name}: valor no numérico '{texto}' descartado")
+            return None
+
     def _read_serial_latest_line(self) -> str:
         """Lee del puerto serie y devuelve únicamente la ÚLTIMA trama completa.
 
@@ -180,27 +462,55 @@ class Analyzer:
 
         Esta función drena todo lo que esté en el buffer en cada poll,
         descarta las líneas viejas y devuelve solo la más reciente, completa.
+        El rezago se lee en bloques sobre un buffer reutilizable del que solo
+        se conserva la cola desde la última trama completa, y solo esa trama
+        se decodifica; los bytes y líneas descartados quedan en self.backlog.
         Si no hay líneas completas (equipo silencioso o trama parcial),
         devuelve cadena vacía.
         """
+        if self._reader is not None:
+            return self._reader.latest()
         if not self._puerto:
             return ""
         try:
-            primera = self._puerto.read_until()
-            rezago = b""
+            cola = self._tail
+            del cola[:]
+            cola += self._puerto.read_until()
+            leidos, descartados, lineas = len(cola), 0, 0
             while self._puerto.in_waiting:
-                chunk = self._puerto.read(self._puerto.in_waiting)
+                chunk = self._puerto.read(min(self._puerto.in_waiting, TAIL_CHUNK))
                 if not chunk:
                     break
-                rezago += chunk
-            if rezago:
+                leidos += len(chunk)
+                cola += chunk
+                # Solo se conserva desde el comienzo de la última trama
+                # completa, así la memoria no depende del rezago acumulado.
+                limites = _ultima_trama(cola)
+                corte = limites[0] if limites else cola.rfind(b"\n") + 1
+                if len(cola) - corte > TAIL_MAX_LINE:
+                    corte = len(cola)
+                if corte:
+                    lineas += cola.count(b"\n", 0, corte)
+                    descartados += corte
+                    del cola[:corte]
+
+            limites = _ultima_trama(cola)
+            if limites:
+                inicio, fin = limites
+                lineas += cola.count(b"\n") - 1
+                descartados += len(cola) - (fin - inicio + 1)
+            else:
+                lineas += cola.count(b"\n")
+                descartados += len(cola)
+            self.backlog.add(leidos, descartados, lineas)
+            if leidos > len(cola):
                 registro.debug(
-                    f"{self.name}: drenando {len(rezago)} bytes adicionales del buffer"
+                    f"{self.name}: drenando {leidos} bytes del buffer, "
+                    f"{lineas} líneas descartadas"
                 )
-            todo = (primera + rezago).decode(errors="ignore")
-            partes_completas = todo.split("\n")[:-1]
-            lineas = [linea.strip() for linea in partes_completas if linea.strip()]
-            return lineas[-1] if lineas else ""
+            if not limites:
+                return ""
+            return cola[inicio:fin].decode(errors="ignore").strip()
         except serial.SerialTimeoutException:
             return ""
         except Exception as error:
@@ -212,6 +522,8 @@ class Analyzer:
 
 class O341M(Analyzer):
     COLUMNS = ("O3", "EXT1", "EXT2")
+    FRAME_TIME = "%d-%m-%y %H:%M"
+    BATCH = True
 
     def _get_values(self) -> dict:
         registro.debug(f"Leyendo el puerto serial del analizador {self.name}")
@@ -219,15 +531,17 @@ class O341M(Analyzer):
             respuesta = "14-00-01 23:06  M000  O3   17.7  PPB   EXT1   1.0   mv   EXT2   0.0   mv"
         else:
             respuesta = self._read_serial_latest_line()
+        return self._parse_frame(respuesta)
 
+    def _parse_frame(self, respuesta: str) -> dict:
         resultado = {}
         valores = respuesta.replace("\0", " ").split()
         if len(valores) > 11 and _status_valido(valores[2]):
-            resultado = {
-                valores[3]: f"{valores[4]} {valores[5]}",
-                valores[6]: f"{valores[7]} {valores[8]}",
-                valores[9]: f"{valores[10]} {valores[11]}",
-            }
+            status = valores[2]
+            for canal in (3, 6, 9):
+                lectura = self._reading(valores[canal + 1], valores[canal + 2], status)
+                if lectura is not None:
+                    resultado[valores[canal]] = lectura
             registro.info(f"Se recibieron los siguientes datos: {valores}")
         elif len(valores) > 11:
             registro.warning(
@@ -239,6 +553,8 @@ class O341M(Analyzer):
 
 class AF22M(Analyzer):
     COLUMNS = ("SO2",)
+    FRAME_TIME = "%d-%m-%y %H:%M"
+    BATCH = True
 
     def _get_values(self) -> dict:
         registro.debug(f"Leyendo el puerto serial del analizador {self.name}")
@@ -246,7 +562,9 @@ class AF22M(Analyzer):
             respuesta = "07-09-23 16:41  M000 SO2       3.510 PPB"
         else:
             respuesta = self._read_serial_latest_line()
+        return self._parse_frame(respuesta)
 
+    def _parse_frame(self, respuesta: str) -> dict:
         resultado = {}
         valores = respuesta.replace("\0", " ").split()
         if not valores:
@@ -265,9 +583,9 @@ class AF22M(Analyzer):
             )
             return resultado
 
-        resultado = {
-            valores[3]: f"{valores[4]} {valores[5]}",
-        }
+        lectura = self._reading(valores[4], valores[5], valores[2])
+        if lectura is not None:
+            resultado[valores[3]] = lectura
         registro.info(f"Se recibieron los siguientes datos: {valores}")
         return resultado
 
@@ -313,11 +631,10 @@ class EcoPhysicsNOx(Analyzer):
             )
             return resultado
 
-        resultado = {
-            "NO2": valores[0],
-            "NO": valores[1],
-            "NOx": valores[2],
-        }
+        for canal, texto in zip(self.COLUMNS, valores):
+            lectura = self._reading(texto)
+            if lectura is not None:
+                resultado[canal] = lectura
         return resultado
 
     def transaccion(self, comando, argumento):
@@ -392,6 +709,7 @@ class GrimmEDM264(Analyzer):
         "GrimmRH",
         "GrimmPres",
     )
+    PUSH = True
 
     def __init__(
         self,
@@ -408,54 +726,54 @@ class GrimmEDM264(Analyzer):
         self._publisher = publisher
         self._topic = topic
         self._simulated = simulated
-        self._socket = None
-        self._rx_buffer = b""
-        self._last_p = {}
-        self._last_rx_at = 0.0
+        self._link = None
+        self._loop = None
         self._stale_after = 120.0
-        self.dir = ""
-        self._last_data = None
-        self.filter_data = 0
+        self._frames = FrameBuffer(
+            f"Grimm {name}", size=64, stale_after=self._stale_after, max_line=16384
+        )
+        self._last_p = {}
+        self._init_storage()
         self.respuesta = ""
 
-    def _ensure_connection(self):
-        if self._socket is not None:
+    def attach(self, loop):
+        """Asigna el IOLoop que maneja la conexión: el connect no bloqueante,
+        el ^E, el keepalive, el watchdog y las reconexiones ocurren en el
+        hilo del loop y el poll solo consume las líneas ya recibidas."""
+        if self._simulated:
             return
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(5)
-            s.connect((self._host, self._tcp_port))
-            # Keepalive: detectar conexiones zombie cuando el Grimm se reinicia
-            # sin cerrar la sesión TCP. Sin esto, recv() solo timeoutea y nunca
-            # se reconecta — los datos no vuelven hasta reiniciar el daemon.
-            s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-            try:
-                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
-                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
-                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
-            except (AttributeError, OSError):
-                pass
-            s.sendall(b"\x05")
-            self._socket = s
-            self._rx_buffer = b""
-            self._last_rx_at = time.monotonic()
-            registro.info(
-                f"Grimm {self._name}: conectado a {self._host}:{self._tcp_port}"
-            )
-        except Exception as error:
-            registro.error(
-                f"Grimm {self._name}: no se pudo conectar a {self._host}:{self._tcp_port}, {error}"
-            )
-            self._socket = None
-
-    def _drop_connection(self):
-        if self._socket is not None:
-            try:
-                self._socket.close()
-            except Exception:
-                pass
-        self._socket = None
-        self._rx_buffer = b""
+        if self._link is not None:
+            self._link.close()
+        if self._loop is not None and self._loop is not loop:
+            self._loop.stop()
+            self._loop = None
+        self._link = TcpLink(
+            loop,
+            self._host,
+            self._tcp_port,
+            self._frames,
+            f"Grimm {self._name}",
+            handshake=b"\x05",
+            stale_after=self._stale_after,
+        )
+        self._link.start()
+
+    def _ensure_link(self):
+        # Sin un IOLoop compartido (io.selector) el equipo usa uno propio, así
+        # un Grimm apagado nunca demora el ciclo de los demás analizadores.
+        if self._link is None:
+            self._loop = IOLoop()
+            self._loop.start()
+            self.attach(self._loop)
+
+    def close(self):
+        if self._link is not None:
+            self._link.close()
+            self._link = None
+        if self._loop is not None:
+            self._loop.stop()
+            self._loop = None
+        super().close()
 
     def _read_available_lines(self):
         if self._simulated:
@@ -464,45 +782,8 @@ class GrimmEDM264(Analyzer):
                 "N_     17.2      9.2      5.6      4.7      4.0      4.6     14.8     12.2      7.1     11.7      5.3      4.3    53459",
             ]
 
-        self._ensure_connection()
-        if self._socket is None:
-            return []
-
-        # Watchdog: si pasaron _stale_after segundos sin un solo byte del Grimm
-        # consideramos la sesión zombie y forzamos reconexión, lo que reenvía
-        # el ^E al equipo recién reiniciado para volver a habilitar la salida.
-        if time.monotonic() - self._last_rx_at > self._stale_after:
-            registro.warning(
-                f"Grimm {self._name}: {self._stale_after:.0f}s sin datos, reconectando"
-            )
-            self._drop_connection()
-            return []
-
-        lines = []
-        try:
-            self._socket.settimeout(0.3)
-            while True:
-                chunk = self._socket.recv(4096)
-                if not chunk:
-                    registro.warning(
-                        f"Grimm {self._name}: el equipo cerró el socket"
-                    )
-                    self._drop_connection()
-                    break
-                self._rx_buffer += chunk
-                self._last_rx_at = time.monotonic()
-        except socket.timeout:
-            pass
-        except Exception as error:
-            registro.warning(f"Grimm {self._name}: error leyendo socket, {error}")
-            self._drop_connection()
-
-        while b"\r\n" in self._rx_buffer:
-            raw, self._rx_buffer = self._rx_buffer.split(b"\r\n", 1)
-            decoded = raw.decode("ascii", errors="ignore").strip()
-            if decoded:
-                lines.append(decoded)
-        return lines
+        self._ensure_link()
+        return [texto for _, texto in self._frames.frames()]
 
     @staticmethod
     def _f(text):
@@ -571,12 +852,6 @@ class GrimmEDM264(Analyzer):
             resultado.setdefault(k, v)
         return resultado
 
-    def _serialize_values(self, values) -> str:
-        result = datetime.strftime(datetime.now(), '"%Y-%m-%d","%H:%M:%S"')
-        for column in self.COLUMNS:
-            result = result + f',"{values.get(column, "NA")}"'
-        return result
-
 
 class WeatherUnderground(Analyzer):
     """Estación meteorológica que envía datos por HTTP en formato Wunderground.
@@ -586,11 +861,14 @@ class WeatherUnderground(Analyzer):
     "Customized Website". El equipo manda peticiones HTTP GET a
     /weatherstation/updateweatherstation.php?ID=...&PASSWORD=...&...&action=updateraw
 
-    Esta clase levanta un servidor HTTP en un hilo en segundo plano que
-    captura cada update, lo convierte a unidades métricas y lo deja en un
-    estado interno para que la próxima invocación de poll() lo publique al
-    MQTT como cualquier otro analyzer. Si no llega un update entre dos polls
-    consecutivos, _get_values devuelve {} y no se publica nada.
+    Esta clase levanta un servidor HTTP asíncrono en un hilo en segundo plano
+    que captura cada update, lo convierte a unidades métricas y lo guarda con
+    su instante de recepción en un buffer circular de series entradas. En
+    cada poll() los updates acumulados se reducen con el estadístico de
+    REDUCTIONS y se publican al MQTT como cualquier otro analyzer; con
+    ingest "all" además se almacena la serie completa. Si no llega un update
+    entre dos polls consecutivos, _get_values devuelve {} y no se publica
+    nada.
 
     Conversiones aplicadas:
       tempf, indoortempf, dewptf  →  °C
@@ -599,6 +877,21 @@ class WeatherUnderground(Analyzer):
       rainin, dailyrainin           →  mm
     """
 
+    BATCH = True
+    PUSH = True
+
+    # Estadístico con que se reduce cada campo cuando llegan varios updates
+    # entre dos polls; los que no figuran se promedian. Las lluvias son
+    # acumulados del equipo, así que vale el último.
+    REDUCTIONS = {
+        "MeteoWindGust": "max",
+        "MeteoWindDir": "vector",
+        "MeteoRainHour": "last",
+        "MeteoRainDay": "last",
+        "MeteoRainWeek": "last",
+        "MeteoRainMonth": "last",
+    }
+
     COLUMNS = (
         "MeteoTempOut",
         "MeteoRHOut",
@@ -627,22 +920,25 @@ class WeatherUnderground(Analyzer):
         station_id: str = None,
         password: str = None,
         bind: str = "0.0.0.0",
+        max_connections: int = 16,
+        series: int = 256,
+        ingest="latest",
         simulated=False,
     ) -> None:
         self._name = name
         self._http_port = int(port)
+        self._max_connections = max_connections
         self._publisher = publisher
         self._topic = topic
         self._simulated = simulated
         self._station_id = station_id
         self._password = password
         self._bind = bind
+        self.ingest = ingest
         self._lock = threading.Lock()
-        self._latest = None
+        self._series = deque(maxlen=series)
         self._server = None
-        self.dir = ""
-        self._last_data = None
-        self.filter_data = 0
+        self._init_storage()
         self.respuesta = ""
 
         if not self._simulated:
@@ -650,23 +946,21 @@ class WeatherUnderground(Analyzer):
 
     def _start_server(self):
         try:
-            handler_cls = self._make_handler()
-            # ThreadingHTTPServer: cada request se atiende en su propio hilo, así
-            # un cliente lento o con una conexión a medio cerrar (típico del
-            # firmware EasyWeather del WH2900) no bloquea el accept() del resto.
-            # daemon_threads evita que esos hilos impidan cerrar el proceso.
-            self._server = ThreadingHTTPServer(
-                (self._bind, self._http_port), handler_cls
-            )
-            self._server.daemon_threads = True
-            thread = threading.Thread(
-                target=self._server.serve_forever,
+            # Un único hilo con asyncio atiende todas las conexiones, con un
+            # cupo de conexiones simultáneas: un cliente lento o con una
+            # conexión a medio cerrar (típico del firmware EasyWeather del
+            # WH2900) ocupa un lugar hasta el timeout pero no un hilo.
+            self._server = HttpServer(
+                self._bind,
+                self._http_port,
+                self._handle_get,
                 name=f"WU-{self._name}",
-                daemon=True,
+                max_connections=self._max_connections,
+                timeout=15,
             )
-            thread.start()
+            self._server.start()
             registro.info(
-                f"WU {self._name}: escuchando HTTP en {self._bind}:{self._http_port}"
+                f"WU {self._name}: escuchando HTTP en {self._bind}:{self._server.port}"
             )
         except Exception as error:
             registro.error(
@@ -675,22 +969,11 @@ class WeatherUnderground(Analyzer):
             )
             self._server = None
 
-    def _make_handler(self):
-        outer = self
-
-        class _Handler(BaseHTTPRequestHandler):
-            # Corta lecturas/escrituras que se queden colgadas en un cliente
-            # que abrió la conexión pero no la completa, liberando el hilo.
-            timeout = 15
-
-            def do_GET(handler):
-                outer._handle_get(handler)
-
-            def log_message(handler, fmt, *args):
-                # silencio el access log default; loggea registro.debug si querés
-                return
-
-        return _Handler
+    def close(self):
+        if self._server is not None:
+            self._server.stop()
+            self._server = None
+        super().close()
 
     def _handle_get(self, handler):
         try:
@@ -746,9 +1029,7 @@ class WeatherUnderground(Analyzer):
 
             if valores:
                 with self._lock:
-                    if self._latest is None:
-                        self._latest = {}
-                    self._latest.update(valores)
+                    self._series.append((valores, datetime.now()))
                 registro.info(
                     f"WU {self._name}: update recibido {valores}"
                 )
@@ -821,14 +1102,54 @@ class WeatherUnderground(Analyzer):
         grabar("MeteoUV", "UV")
         return resultado
 
-    def _get_values(self) -> dict:
+    def _take_series(self) -> list:
         with self._lock:
-            data = self._latest
-            self._latest = None
-        return data or {}
-
-    def _serialize_values(self, values) -> str:
-        result = datetime.strftime(datetime.now(), '"%Y-%m-%d","%H:%M:%S"')
-        for column in self.COLUMNS:
-            result = result + f',"{values.get(column, "NA")}"'
-        return result
+            series = list(self._series)
+            self._series.clear()
+        return series
+
+    def _get_values(self) -> dict:
+        return self._summarize(self._take_series())
+
+    def _get_batch(self) -> list:
+        return self._take_series()
+
+    def _summarize(self, batch: list) -> dict:
+        """Reduce los updates recibidos desde el último poll a un valor por
+        campo con el estadístico que corresponde a cada uno."""
+        campos = {}
+        for valores, _ in batch:
+            for campo, valor in valores.items():
+                campos.setdefault(campo, []).append(valor)
+
+        resultado = {}
+        for campo, valores in campos.items():
+            reduccion = self.REDUCTIONS.get(campo, "mean")
+            if reduccion == "last":
+                resultado[campo] = valores[-1]
+            elif reduccion == "max":
+                resultado[campo] = max(valores)
+            elif reduccion == "vector":
+                resultado[campo] = self._vector_mean(batch, campo)
+            else:
+                resultado[campo] = round(sum(valores) / len(valores), 3)
+        return resultado
+
+    @staticmethod
+    def _vector_mean(batch: list, campo: str) -> float:
+        """Dirección media del viento como promedio de vectores unitarios
+        pesados por la velocidad de cada update; si todos son calma se usa
+        el peso unitario para que la dirección siga definida."""
+        x = y = x1 = y1 = 0.0
+        for valores, _ in batch:
+            if campo not in valores:
+                continue
+            angulo = math.radians(valores[campo])
+            peso = valores.get("MeteoWindSpeed", 1.0)
+            x += peso * math.sin(angulo)
+            y += peso * math.cos(angulo)
+            x1 += math.sin(angulo)
+            y1 += math.cos(angulo)
+        if math.hypot(x, y) < 1e-9:
+            x, y = x1, y1
+        return round(math.degrees(math.atan2(x, y)) % 360, 3)
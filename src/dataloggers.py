@@ -27,25 +27,96 @@
 # SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
 ##################################################################################################
 
-import re
+import math
+import time
+import heapq
 import yaml
 import json
 import getmac
 import logging
+import functools
+import threading
 import paho.mqtt.client as mqtt
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from typing import Dict, List
 from analyzers import *
+from storage import Compressor
+from spool import SegmentQueue
+from aggregation import Aggregator
+from scheduler import Scheduler
+from readers import IOLoop
+from health import CircuitBreaker, HALF_OPEN
+from ndata import NdataCodec
+from deadband import ReportByException
 
 registro = logging.getLogger(__name__)
 
+# Margen para considerar vencido un analizador cuando el tick del
+# planificador despierta apenas antes del múltiplo de su intervalo.
+TOLERANCE = 0.1
+
 
 class MqttHandler(logging.Handler):
-    def __init__(self, client, topic):
+    """Publica los registros de log en MQTT desde un hilo propio.
+
+    emit() solo encola el registro y nunca bloquea al hilo que loguea: si la
+    cola está llena el registro se descarta y se cuenta. Un registro igual a
+    otro que todavía espera en la cola (mismo nivel, logger y mensaje) no
+    ocupa lugar, se suma a la cuenta de repeticiones del que espera. El hilo
+    publica a lo sumo rate mensajes por segundo con ráfagas de hasta burst,
+    por lo que una tormenta de advertencias se resume en pocos mensajes.
+    """
+
+    def __init__(
+        self,
+        client,
+        topic,
+        size: int = 256,
+        rate: float = 1.0,
+        burst: int = 10,
+        clock: callable = time.monotonic,
+    ):
         logging.Handler.__init__(self)
         self._client = client
         self._topic = topic
+        self.size = size
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._pending = deque()
+        self._waiting = {}
+        self._condition = threading.Condition()
+        self._tokens = burst
+        self._tokens_at = clock()
+        self._thread = None
+        self._stopping = False
+        self.sent = 0
+        self.collapsed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="MqttLog", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = None):
+        if self._thread is not None:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self):
+        self.stop(timeout=1)
+        logging.Handler.close(self)
 
     def emit(self, record):
         # noinspection PyBroadException,PyPep8
@@ -53,12 +124,68 @@ class MqttHandler(logging.Handler):
             message = self.format(record)
             if message.find("\n"):
                 message = message.split("\n")[0]
-            self._client.publish(topic=self._topic, payload=message)
+            clave = (record.levelno, record.name, record.getMessage())
+            with self._condition:
+                pendiente = self._waiting.get(clave)
+                if pendiente is not None:
+                    pendiente[1] += 1
+                    self.collapsed += 1
+                elif len(self._pending) >= self.size:
+                    self.dropped += 1
+                else:
+                    pendiente = [message, 1, clave]
+                    self._waiting[clave] = pendiente
+                    self._pending.append(pendiente)
+                    self._condition.notify()
         except (KeyboardInterrupt, SystemExit):
             raise
         except:
             self.handleError(record)
 
+    def publish_pending(self) -> float:
+        """Publica los mensajes encolados que permite el balde de fichas y
+        devuelve los segundos hasta la próxima ficha si quedaron mensajes
+        esperando, o 0 si la cola quedó vacía."""
+        while True:
+            with self._condition:
+                if not self._pending:
+                    return 0.0
+                ahora = self._clock()
+                self._tokens = min(
+                    self.burst, self._tokens + (ahora - self._tokens_at) * self.rate
+                )
+                self._tokens_at = ahora
+                if self._tokens < 1:
+                    return (1 - self._tokens) / self.rate
+                self._tokens -= 1
+                message, repeticiones, clave = self._pending.popleft()
+                del self._waiting[clave]
+            if repeticiones > 1:
+                message = f"{message} (repetido {repeticiones} veces)"
+            try:
+                self._client.publish(topic=self._topic, payload=message)
+                self.sent += 1
+            except Exception:
+                self.errors += 1
+
+    def _run(self):
+        espera = None
+        while True:
+            with self._condition:
+                if not self._stopping and (not self._pending or espera):
+                    self._condition.wait(espera)
+                detener = self._stopping
+            # Al detenerse se envía lo que todavía permite el balde.
+            espera = self.publish_pending() or None
+            if detener:
+                break
+
+    def __str__(self) -> str:
+        return (
+            f"enviados={self.sent} agrupados={self.collapsed} "
+            f"descartados={self.dropped} errores={self.errors}"
+        )
+
 
 class Datalogger:
     def __init__(self, config: str, simulated=False) -> None:
@@ -74,11 +201,38 @@ class Datalogger:
         self._updated = False
         self._update_cycles = 0
         self._values = {}
+        self._values_lock = threading.Lock()
+        self._queue_lock = threading.Lock()
+        self._scheduler = None
 
         self.configure_mqtt()
+        self.configure_queue()
+        self.configure_polling()
         self.condigure_logger()
 
+        self._compressor = None
+        if self.config("storage.compress", False):
+            self._compressor = Compressor(
+                level=self.config("storage.compress_level", 6)
+            )
+
+        # Con io.selector todos los equipos que transmiten solos se leen desde
+        # un único hilo con selectors en lugar de un hilo o un recv por equipo.
+        self._io_loop = None
+        if self.config("io.selector", False):
+            self._io_loop = IOLoop()
+
+        periodos = []
+        for periodo in self.config("aggregation.periods", []):
+            if Aggregator.valid_period(periodo):
+                periodos.append(periodo)
+            else:
+                registro.error(
+                    f"Se ignora el período de agregación {periodo}, no divide un día"
+                )
+
         self._analyzers = []
+        self._streams = {}
         for analyzer in self.config("anayzers", []):
             registro.debug(
                 f"Creando un analizador con {analyzer.get('name','')} de la clase {analyzer.get('class','')}",
@@ -86,6 +240,12 @@ class Datalogger:
 
             try:
                 clase = analyzer.pop("class")
+                intervalo = analyzer.pop(
+                    "poll_interval", self.config("schedule.poll", 10)
+                )
+                stream = analyzer.pop("stream", self.config("streaming.enabled", False))
+                qos = analyzer.pop("qos", self.config("streaming.qos", 0))
+                retain = analyzer.pop("retain", self.config("streaming.retain", False))
                 analyzer["publisher"] = self.publisher
                 analyzer["simulated"] = simulated
                 analizador = eval(clase)(**analyzer)
@@ -94,12 +254,79 @@ class Datalogger:
                     f"Asignando {analizador.dir} para publicar los archivos de log"
                 )
                 analizador.filter_data = self.config("storage.filter", 0)
+                analizador.flush_rows = self.config("storage.flush_rows", 1)
+                analizador.flush_interval = self.config("storage.flush_interval", 0)
+                analizador.storage_format = self.config("storage.format", "csv")
+                analizador.index_interval = self.config("storage.index_interval", 600)
+                analizador.compressor = self._compressor
+                if periodos:
+                    analizador.aggregator = Aggregator(analizador.COLUMNS, periodos)
+                analizador.poll_interval = intervalo
+                if stream:
+                    self._streams[analizador] = (qos, retain)
+                    analizador.stream = self.stream
+                if self._io_loop is not None:
+                    analizador.attach(self._io_loop)
                 self._analyzers.append(analizador)
             except:
                 registro.error(
                     f"No se pudo crear el analizador {analyzer['name']} del tipo {clase}"
                 )
 
+        # Con mqtt.encoding binary el NDATA se envía empaquetado y el esquema
+        # de canales se anuncia en el NBIRTH.
+        self._codec = None
+        if self.config("mqtt.encoding", "json") == "binary":
+            self._codec = NdataCodec(
+                [column for item in self._analyzers for column in item.COLUMNS],
+                double=self.config("mqtt.precision", 32) == 64,
+            )
+
+        # Con la sección deadband cada NDATA lleva solo los canales que se
+        # movieron más que su banda muerta o que llevan max_silence callados.
+        self._exception = None
+        if self.config("deadband", None):
+            self._exception = ReportByException(
+                absolute=self.config("deadband.absolute", 0.0),
+                relative=self.config("deadband.relative", 0.0),
+                max_silence=self.config(
+                    "deadband.max_silence", 10 * self.config("schedule.ndata", 60)
+                ),
+                channels=self.config("deadband.channels", {}),
+            )
+
+        self.schedule_analyzers()
+
+    def schedule_analyzers(self):
+        """Arma el heap de vencimientos de los analizadores: cada uno vence
+        en los múltiplos de su poll_interval y solo los vencidos se consultan
+        en cada tick, los demás no cuestan nada hasta su próximo turno."""
+        self._due = [(0.0, indice) for indice in range(len(self._analyzers))]
+        heapq.heapify(self._due)
+
+    def _due_analyzers(self, ahora: float) -> list:
+        vencidos = []
+        while self._due and self._due[0][0] <= ahora + TOLERANCE:
+            vencidos.append(heapq.heappop(self._due)[1])
+        for indice in vencidos:
+            intervalo = self._analyzers[indice].poll_interval
+            if intervalo > 0:
+                proximo = ((ahora + TOLERANCE) // intervalo + 1) * intervalo
+            else:
+                proximo = ahora
+            heapq.heappush(self._due, (proximo, indice))
+        return [self._analyzers[indice] for indice in sorted(vencidos)]
+
+    def poll_tick(self) -> float:
+        """Período del tick de consulta: el máximo común divisor de los
+        intervalos de los analizadores, o el menor si no son enteros."""
+        intervalos = [a.poll_interval for a in self._analyzers if a.poll_interval > 0]
+        if not intervalos:
+            return self.config("schedule.poll", 10)
+        if all(isinstance(intervalo, int) for intervalo in intervalos):
+            return functools.reduce(math.gcd, intervalos)
+        return min(intervalos)
+
     def configure_mqtt(self):
         servidor = self.config("mqtt.server", "datalogger")
         registro.debug(f"Conectando al servidor mqtt {servidor}")
@@ -120,16 +347,123 @@ class Datalogger:
         )
         self._client.loop_start()
 
+    def configure_polling(self):
+        self._pool = None
+        self._polls = {}
+        self._breakers = {}
+        self._health = None
+        if self.config("health.threshold", 0) > 0:
+            self._health = {
+                "threshold": self.config("health.threshold", 0),
+                "backoff": self.config("health.backoff", 30),
+                "max_backoff": self.config("health.max_backoff", 600),
+            }
+        self._deadline = self.config("polling.deadline", 5)
+        workers = self.config("polling.workers", 1)
+        if workers > 1:
+            registro.debug(f"Consultando los analizadores con {workers} hilos")
+            self._pool = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="Poll"
+            )
+
+    def configure_queue(self):
+        self._queue = None
+        self._inflight = []
+        self._inflight_at = 0.0
+        directorio = self.config("mqtt.queue.dir", None)
+        if not directorio:
+            return
+        registro.debug(f"Usando la cola persistente de mensajes en {directorio}")
+        self._queue = SegmentQueue(
+            directorio,
+            segment_size=self.config("mqtt.queue.segment_size", 1024 * 1024),
+            max_bytes=self.config("mqtt.queue.max_bytes", 64 * 1024 * 1024),
+        )
+        self._queue_batch = self.config("mqtt.queue.batch", 20)
+        self._queue_rate = self.config("mqtt.queue.rate", 5)
+        self._queue_timeout = self.config("mqtt.queue.timeout", 60)
+        self._tokens = self._queue_batch
+        self._tokens_at = time.monotonic()
+
+    def _send(self, topic: str, payload: str):
+        if self._queue is None:
+            self._client.publish(topic=topic, payload=self._encode(topic, payload))
+        else:
+            with self._queue_lock:
+                self._queue.push(topic, payload)
+            self._drain()
+
+    def _drain(self):
+        """Envía un lote de mensajes de la cola persistente con QoS 1.
+
+        Hay un único lote en vuelo: el cursor de la cola avanza recién cuando
+        el broker confirmó todos sus mensajes, y si eso no ocurre en
+        mqtt.queue.timeout segundos el lote se vuelve a leer desde el cursor.
+        El tamaño de cada lote está limitado por un balde de fichas que se
+        recarga a mqtt.queue.rate mensajes por segundo.
+        """
+        with self._queue_lock:
+            self._drain_batch()
+
+    def _drain_batch(self):
+        ahora = time.monotonic()
+        if self._inflight:
+            if all(info.is_published() for info, _ in self._inflight):
+                self._queue.commit(self._inflight[-1][1])
+                self._inflight = []
+            elif ahora - self._inflight_at > self._queue_timeout:
+                registro.warning(f"El broker no confirmó el lote enviado, reintentando")
+                self._inflight = []
+            else:
+                return
+
+        if not self._client.is_connected():
+            return
+
+        self._tokens = min(
+            self._queue_batch,
+            self._tokens + (ahora - self._tokens_at) * self._queue_rate,
+        )
+        self._tokens_at = ahora
+        for topic, payload, posicion in self._queue.peek(int(self._tokens)):
+            info = self._client.publish(
+                topic=topic, payload=self._encode(topic, payload), qos=1
+            )
+            self._inflight.append((info, posicion))
+            self._tokens -= 1
+        self._inflight_at = ahora
+
+    def _encode(self, topic: str, payload):
+        """Con la codificación binaria los NDATA se guardan en la cola como
+        JSON y se empaquetan recién al enviarlos, con el esquema vigente: si
+        el esquema cambia mientras hay mensajes encolados, o entre un
+        reinicio y otro, ninguno sale codificado con un esquema viejo."""
+        if self._codec is None or not topic.startswith("V0/NDATA/"):
+            return payload
+        valores = json.loads(payload)
+        ts = valores.pop("meta")["ts"]
+        if self._codec.add_channels(valores):
+            self.birth()
+        return self._codec.encode([(ts, valores)])
+
     def condigure_logger(self):
         logger = logging.getLogger()
-        handler = MqttHandler(self._client, f"V0/NLOG/{self._mac}")
+        handler = MqttHandler(
+            self._client,
+            f"V0/NLOG/{self._mac}",
+            size=self.config("mqtt.log.queue", 256),
+            rate=self.config("mqtt.log.rate", 1.0),
+            burst=self.config("mqtt.log.burst", 10),
+        )
         formatter = logging.Formatter(
             "%(asctime)-20s %(levelname)-10s %(name)-15s %(message)-s",
             "%Y-%m-%d %H:%M:%S",
         )
         handler.setFormatter(formatter)
         handler.setLevel(logging.WARNING)
+        handler.start()
         logger.addHandler(handler)
+        self._log_handler = handler
 
     def config(self, ruta: str, predeterminado: any) -> dict:
         dicccionario = self._config
@@ -141,6 +475,30 @@ class Datalogger:
         return dicccionario
 
     def start(self):
+        self.birth()
+        registro.debug(f"Iniciando el cliente MQTT")
+
+        if self._compressor:
+            # Solo al arrancar, antes de que los writers escriban: después
+            # los meses cerrados llegan al compresor desde la rotación.
+            self._compressor.start()
+            self._compressor.scan(self.config("storage.dir", None), datetime.now())
+
+        if self._io_loop is not None:
+            self._io_loop.start()
+
+    def poll(self):
+        if (datetime.now() - self._last_heart_beat).total_seconds() > 10:
+            self.heartbeat()
+            self._update_cycles += 1
+
+        self.poll_analyzers()
+
+        if self._updated and self._update_cycles >= 6:
+            self.publish_data()
+            self._update_cycles = 0
+
+    def birth(self):
         topic = f"V0/NBIRTH/{self._mac}"
         payload = {
             "ts": int(datetime.now().timestamp()),
@@ -149,40 +507,207 @@ class Datalogger:
             "lat": self._latitude,
             "lon": self._longitude,
         }
-        self._client.publish(topic=topic, payload=json.dumps(payload))
-        registro.debug(f"Iniciando el cliente MQTT")
+        if self._codec is None:
+            self._client.publish(topic=topic, payload=json.dumps(payload))
+        else:
+            # Retenido para que quien se suscriba después pueda decodificar.
+            payload["schema"] = self._codec.schema()
+            self._client.publish(topic=topic, payload=json.dumps(payload), retain=True)
 
-    def poll(self):
-        if (datetime.now() - self._last_heart_beat).total_seconds() > 10:
-            self._last_heart_beat = datetime.now()
-            topic = f"V0/NHI/{self._mac}"
-            self._client.publish(topic=topic, payload=1)
-            self._update_cycles += 1
+    def heartbeat(self):
+        self._last_heart_beat = datetime.now()
+        topic = f"V0/NHI/{self._mac}"
+        self._client.publish(topic=topic, payload=1)
 
+    def poll_analyzers(self):
+        analyzers = [a for a in self._due_analyzers(time.time()) if self._allowed(a)]
+        if self._pool is None:
+            for analyzer in analyzers:
+                self._poll_analyzer(analyzer)
+        elif analyzers:
+            self._poll_concurrently(analyzers)
+        # Los writers descargan por flush_interval aunque su analizador no
+        # haya traído filas nuevas en este ciclo.
         for analyzer in self._analyzers:
-            analyzer.poll()
+            analyzer.flush_due()
 
-        if self._updated and self._update_cycles >= 6:
-            topic = f"V0/NDATA/{self._mac}"
-            payload = {
-                "meta": {
-                    "ts": int(datetime.now().timestamp()),
-                    "mac": self._mac,
-                },
-            }
-            payload.update(self._values)
-            self._client.publish(topic=topic, payload=json.dumps(payload))
+        if self._queue is not None:
+            self._drain()
+
+    def _allowed(self, analyzer) -> bool:
+        """Consulta el circuit breaker del analizador: los que acumularon
+        polls vacíos no se consultan hasta que vence su espera, y entonces
+        se prueba con un único poll. Los equipos que transmiten solos no
+        pasan por el breaker: entre dos envíos sus polls vienen vacíos."""
+        if self._health is None or getattr(analyzer, "push", False):
+            return True
+        breaker = self._breakers.get(analyzer)
+        if breaker is None:
+            breaker = self._breakers[analyzer] = CircuitBreaker(**self._health)
+        anterior = breaker.state
+        permitido = breaker.allow()
+        if breaker.state != anterior:
+            self.publish_state(analyzer, breaker)
+        return permitido
+
+    def _poll_analyzer(self, analyzer) -> dict:
+        values = analyzer.poll()
+        breaker = self._breakers.get(analyzer)
+        if breaker is not None and breaker.record(bool(values)):
+            self.publish_state(analyzer, breaker)
+        return values
+
+    def publish_state(self, analyzer, breaker: CircuitBreaker):
+        if breaker.state == HALF_OPEN:
+            registro.info(f"Probando nuevamente el analizador {analyzer.name}")
+        elif breaker.failures:
+            registro.warning(
+                f"El analizador {analyzer.name} no responde después de {breaker.failures} "
+                f"intentos, se vuelve a probar en {breaker.delay:.0f}s"
+            )
+        else:
+            registro.info(f"El analizador {analyzer.name} volvió a responder")
+        topic = f"V0/NSTATE/{self._mac}"
+        payload = {
+            "ts": int(datetime.now().timestamp()),
+            "lbl": analyzer.name,
+            "state": breaker.state,
+            "failures": breaker.failures,
+            "retry": round(breaker.retry_in),
+        }
+        self._send(topic, json.dumps(payload))
+
+    def publish_data(self):
+        if not self._updated:
+            return
+        topic = f"V0/NDATA/{self._mac}"
+        ts = int(datetime.now().timestamp())
+        with self._values_lock:
+            valores = self._values
             self._values = {}
             self._updated = False
-            self._update_cycles = 0
+        if self._exception is not None:
+            valores = self._exception.filter(valores)
+            if not valores:
+                return
+        payload = {"meta": {"ts": ts, "mac": self._mac}}
+        payload.update(valores)
+        self._send(topic, json.dumps(payload))
+
+    def maintenance(self):
+        for analyzer in self._analyzers:
+            analyzer.flush()
+        for analyzer in self._analyzers:
+            backlog = getattr(analyzer, "backlog", None)
+            if backlog is not None and backlog.polls:
+                registro.info(f"Rezago del analizador {analyzer.name}: {backlog}")
+        if self._exception is not None:
+            registro.info(f"Reporte por excepcion: {self._exception}")
+        registro.info(f"Mensajes de log por MQTT: {self._log_handler}")
+        if self._scheduler is not None:
+            for nombre, metricas in self._scheduler.metrics.items():
+                registro.info(f"Tarea {nombre}: {metricas}")
+
+    def scheduler(self) -> Scheduler:
+        """Arma el planificador con las tareas periódicas del datalogger,
+        alineadas a instantes absolutos del reloj: consulta de analizadores,
+        heartbeat, publicación de NDATA y mantenimiento de los archivos."""
+        self._scheduler = Scheduler()
+        self._scheduler.every("poll", self.poll_tick(), self.poll_analyzers)
+        self._scheduler.every(
+            "heartbeat", self.config("schedule.heartbeat", 10), self.heartbeat
+        )
+        self._scheduler.every(
+            "ndata", self.config("schedule.ndata", 60), self.publish_data, offset=5
+        )
+        self._scheduler.every(
+            "maintenance", self.config("schedule.maintenance", 3600), self.maintenance
+        )
+        return self._scheduler
+
+    def _poll_concurrently(self, analyzers: list):
+        """Consulta todos los analizadores en paralelo y espera a lo sumo
+        polling.deadline segundos, así la duración del ciclo es la del
+        analizador más lento y no la suma de todos.
+
+        Un analizador que no terminó en el plazo sigue ejecutándose en su
+        hilo y no se vuelve a consultar hasta que termine; si sus valores
+        llegan tarde se publican igualmente en el próximo NDATA.
+        """
+        enviados = {}
+        for analyzer in analyzers:
+            anterior = self._polls.get(analyzer)
+            if anterior is not None and not anterior.done():
+                registro.warning(
+                    f"El analizador {analyzer.name} sigue ocupado, se omite en este ciclo"
+                )
+                continue
+            enviados[analyzer] = self._pool.submit(self._poll_analyzer, analyzer)
+            self._polls[analyzer] = enviados[analyzer]
+
+        # Solo se espera a los polls de este ciclo: uno colgado de un ciclo
+        # anterior no debe demorar todos los siguientes hasta el plazo.
+        if not enviados:
+            return
+        _, pendientes = wait(list(enviados.values()), timeout=self._deadline)
+        for analyzer, future in enviados.items():
+            if future in pendientes:
+                registro.warning(
+                    f"El analizador {analyzer.name} no respondió en {self._deadline}s"
+                )
+            elif future.exception() is not None:
+                registro.error(
+                    f"Error consultando el analizador {analyzer.name}, {future.exception()}"
+                )
+
+    def close(self):
+        for analyzer in self._analyzers:
+            analyzer.close()
+        logging.getLogger().removeHandler(self._log_handler)
+        self._log_handler.close()
+        if self._io_loop is not None:
+            self._io_loop.stop(timeout=1)
+        if self._compressor:
+            self._compressor.stop(timeout=1)
+        if self._queue is not None:
+            self._queue.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
 
     def publisher(self, topic: str, values: List[Dict]):
+        valores = self._numeric(values)
+        with self._values_lock:
+            self._values.update(valores)
+            self._updated = True
+
+    @staticmethod
+    def _numeric(values: dict) -> dict:
+        valores = {}
         for key, value in values.items():
             try:
-                numeric = re.sub(r"[^\d.\-]", "", str(value))
-                self._values[key] = float(numeric)
+                valores[key] = float(value)
             except (ValueError, TypeError) as error:
                 registro.warning(
                     f"No se pudo convertir el valor '{value}' del parametro '{key}': {error}"
                 )
-        self._updated = True
+        return valores
+
+    def stream(self, analyzer, values: dict, fecha: datetime):
+        """Publica una lectura del analizador en su propio topic apenas el
+        poll la obtiene, sin esperar al NDATA ni a que cierre una ventana de
+        agregación; va directo al cliente MQTT con la QoS y el retain
+        configurados y no pasa por la cola persistente."""
+        valores = self._numeric(values)
+        if not valores:
+            return
+        qos, retain = self._streams[analyzer]
+        payload = {
+            "meta": {
+                "ts": int(fecha.timestamp()),
+                "mac": self._mac,
+            },
+        }
+        payload.update(valores)
+        self._client.publish(
+            topic=analyzer.topic, payload=json.dumps(payload), qos=qos, retain=retain
+        )
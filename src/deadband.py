@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import math
+import time
+
+from array import array
+
+
+class ReportByException:
+    """Filtro de reporte por excepción de los canales publicados en NDATA.
+
+    Un canal se reporta solo cuando se aparta del último valor enviado más
+    que su banda muerta, que es la mayor entre la absoluta y la relativa
+    (fracción del último valor), o cuando pasaron max_silence segundos desde
+    su último reporte. La primera lectura de cada canal siempre se reporta.
+    Las bandas pueden ajustarse por canal; el estado es un índice por canal
+    y arreglos de doubles con el último valor y el instante de su envío.
+    """
+
+    def __init__(
+        self,
+        absolute: float = 0.0,
+        relative: float = 0.0,
+        max_silence: float = 600,
+        channels: dict = None,
+        clock: callable = time.monotonic,
+    ) -> None:
+        self.absolute = absolute
+        self.relative = relative
+        self.max_silence = max_silence
+        self._channels = channels or {}
+        self._clock = clock
+        self._index = {}
+        self._absolute = array("d")
+        self._relative = array("d")
+        self._silence = array("d")
+        self._last = array("d")
+        self._sent_at = array("d")
+        self.reported = 0
+        self.suppressed = 0
+
+    def _slot(self, channel: str) -> int:
+        indice = self._index.get(channel)
+        if indice is None:
+            config = self._channels.get(channel, {})
+            indice = self._index[channel] = len(self._last)
+            self._absolute.append(config.get("absolute", self.absolute))
+            self._relative.append(config.get("relative", self.relative))
+            self._silence.append(config.get("max_silence", self.max_silence))
+            self._last.append(math.nan)
+            self._sent_at.append(-math.inf)
+        return indice
+
+    def filter(self, values: dict) -> dict:
+        """Devuelve los canales de values que corresponde reportar y los
+        registra como enviados."""
+        ahora = self._clock()
+        reportar = {}
+        for channel, value in values.items():
+            indice = self._slot(channel)
+            ultimo = self._last[indice]
+            if math.isnan(value) or math.isnan(ultimo):
+                cambio = not (math.isnan(value) and math.isnan(ultimo))
+            else:
+                banda = max(
+                    self._absolute[indice], self._relative[indice] * abs(ultimo)
+                )
+                cambio = abs(value - ultimo) > banda
+            if cambio or ahora - self._sent_at[indice] >= self._silence[indice]:
+                reportar[channel] = value
+                self._last[indice] = value
+                self._sent_at[indice] = ahora
+        self.reported += len(reportar)
+        self.suppressed += len(values) - len(reportar)
+        return reportar
+
+    def __str__(self) -> str:
+        total = self.reported + self.suppressed
+        return (
+            f"canales={len(self._index)} reportados={self.reported} "
+            f"suprimidos={self.suppressed} "
+            f"({100 * self.suppressed / total if total else 0:.1f}%)"
+        )
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import time
+import logging
+
+registro = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Estado de salud de un analizador según el resultado de sus polls.
+
+    Cerrado: se consulta normalmente. Después de threshold polls vacíos
+    consecutivos se abre y no se consulta durante backoff segundos; al
+    vencer pasa a semiabierto y se permite un único poll de prueba. Si la
+    prueba trae datos vuelve a cerrarse, si no se abre otra vez con el
+    doble de espera, hasta max_backoff segundos.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 3,
+        backoff: float = 30,
+        max_backoff: float = 600,
+        clock: callable = time.monotonic,
+    ) -> None:
+        self.threshold = threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.delay = 0.0
+        self._retry_at = 0.0
+
+    @property
+    def retry_in(self) -> float:
+        return max(0.0, self._retry_at - self._clock()) if self.state == OPEN else 0.0
+
+    def allow(self) -> bool:
+        """Indica si corresponde consultar al analizador en este ciclo."""
+        if self.state == OPEN and self._clock() >= self._retry_at:
+            self.state = HALF_OPEN
+        return self.state != OPEN
+
+    def record(self, ok: bool) -> str:
+        """Registra el resultado de un poll y devuelve el estado nuevo si
+        cambió, o None si sigue igual."""
+        anterior = self.state
+        if ok:
+            self.state = CLOSED
+            self.failures = 0
+            self.delay = 0.0
+        else:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                if self.state == HALF_OPEN:
+                    self.delay = min(self.delay * 2, self.max_backoff)
+                else:
+                    self.delay = self.backoff
+                self.state = OPEN
+                self._retry_at = self._clock() + self.delay
+        return self.state if self.state != anterior else None
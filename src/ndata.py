@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import struct
+
+# Versión, formato de los valores, secuencia y cantidad de canales del
+# esquema, marca de tiempo base en segundos UTC y cantidad de muestras.
+HEADER = struct.Struct("<BBBHIH")
+VERSION = 1
+DOUBLE = 0x01
+
+
+def _varint(valor: int) -> bytes:
+    resultado = bytearray()
+    while valor > 0x7F:
+        resultado.append((valor & 0x7F) | 0x80)
+        valor >>= 7
+    resultado.append(valor)
+    return bytes(resultado)
+
+
+def _read_varint(datos: bytes, posicion: int) -> tuple:
+    valor = 0
+    desplazamiento = 0
+    while True:
+        byte = datos[posicion]
+        posicion += 1
+        valor |= (byte & 0x7F) << desplazamiento
+        if byte < 0x80:
+            return valor, posicion
+        desplazamiento += 7
+
+
+class NdataCodec:
+    """Codificación binaria compacta de los mensajes NDATA.
+
+    El esquema se anuncia una sola vez en el NBIRTH como un mapa de canal a
+    índice; cada NDATA lleva entonces solo números. Después de la cabecera
+    cada muestra tiene la diferencia en segundos con la marca de tiempo
+    anterior como varint, un mapa de bits con los canales presentes y sus
+    valores en orden de índice como float32 o float64 empaquetados. Si se
+    agregan canales la secuencia del esquema avanza y hay que volver a
+    anunciarlo; el decodificador rechaza los mensajes de otro esquema. Como
+    los canales solo se agregan, cada mensaje lleva además la cantidad de
+    canales de su esquema y la secuencia puede dar la vuelta en 256 sin que
+    dos esquemas distintos se confundan.
+    """
+
+    def __init__(self, channels=(), double: bool = False, seq: int = 0) -> None:
+        self.double = double
+        self.seq = seq
+        self.channels = []
+        self._index = {}
+        self._format = "d" if double else "f"
+        for channel in channels:
+            if channel not in self._index:
+                self._index[channel] = len(self.channels)
+                self.channels.append(channel)
+
+    @classmethod
+    def from_schema(cls, schema: dict) -> "NdataCodec":
+        canales = sorted(schema["channels"], key=schema["channels"].get)
+        return cls(canales, schema["format"] == "f8", schema["seq"])
+
+    def schema(self) -> dict:
+        return {
+            "seq": self.seq,
+            "format": "f8" if self.double else "f4",
+            "channels": dict(self._index),
+        }
+
+    def add_channels(self, channels) -> bool:
+        """Agrega los canales que falten al final del esquema y devuelve
+        True si cambió, en cuyo caso hay que volver a publicar el NBIRTH."""
+        nuevos = [channel for channel in channels if channel not in self._index]
+        for channel in nuevos:
+            if channel not in self._index:
+                self._index[channel] = len(self.channels)
+                self.channels.append(channel)
+        if nuevos:
+            self.seq = (self.seq + 1) & 0xFF
+        return bool(nuevos)
+
+    def encode(self, samples: list) -> bytes:
+        """Codifica una lista de muestras (ts, {canal: valor}) con las marcas
+        de tiempo en segundos y en orden no decreciente."""
+        base = samples[0][0] if samples else 0
+        partes = [
+            HEADER.pack(
+                VERSION,
+                DOUBLE if self.double else 0,
+                self.seq,
+                len(self.channels),
+                base,
+                len(samples),
+            )
+        ]
+        bytes_mapa = (len(self.channels) + 7) // 8
+        anterior = base
+        for ts, values in samples:
+            if ts < anterior:
+                raise ValueError(f"Marca de tiempo {ts} anterior a {anterior}")
+            try:
+                indices = sorted(self._index[channel] for channel in values)
+            except KeyError as error:
+                raise ValueError(f"Canal {error} fuera del esquema") from None
+            mapa = 0
+            for indice in indices:
+                mapa |= 1 << indice
+            valores = [values[self.channels[indice]] for indice in indices]
+            partes.append(_varint(ts - anterior))
+            partes.append(mapa.to_bytes(bytes_mapa, "little"))
+            partes.append(struct.pack(f"<{len(valores)}{self._format}", *valores))
+            anterior = ts
+        return b"".join(partes)
+
+    def decode(self, payload: bytes) -> list:
+        """Devuelve la lista de muestras (ts, {canal: valor}) de un NDATA."""
+        version, flags, seq, total, ts, cantidad = HEADER.unpack_from(payload)
+        if version != VERSION:
+            raise ValueError(f"Version {version} de NDATA no soportada")
+        if (seq, total) != (self.seq, len(self.channels)):
+            raise ValueError(
+                f"NDATA con el esquema {seq} de {total} canales, se esperaba "
+                f"el {self.seq} de {len(self.channels)}"
+            )
+        formato = "d" if flags & DOUBLE else "f"
+        tamano = struct.calcsize(formato)
+        bytes_mapa = (len(self.channels) + 7) // 8
+        posicion = HEADER.size
+        muestras = []
+        for _ in range(cantidad):
+            delta, posicion = _read_varint(payload, posicion)
+            ts += delta
+            mapa = int.from_bytes(payload[posicion : posicion + bytes_mapa], "little")
+            posicion += bytes_mapa
+            canales = [
+                channel
+                for indice, channel in enumerate(self.channels)
+                if mapa >> indice & 1
+            ]
+            valores = struct.unpack_from(f"<{len(canales)}{formato}", payload, posicion)
+            posicion += len(canales) * tamano
+            muestras.append((ts, dict(zip(canales, valores))))
+        return muestras
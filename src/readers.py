@@ -0,0 +1,584 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import os
+import time
+import errno
+import heapq
+import random
+import socket
+import logging
+import selectors
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+registro = logging.getLogger(__name__)
+
+
+class BacklogMetrics:
+    """Bytes y líneas del rezago del puerto serie que se descartaron por
+    llegar antes que la última trama completa de cada poll."""
+
+    __slots__ = ("polls", "bytes", "dropped_bytes", "dropped_lines")
+
+    def __init__(self) -> None:
+        self.polls = 0
+        self.bytes = 0
+        self.dropped_bytes = 0
+        self.dropped_lines = 0
+
+    def add(self, leidos: int, descartados: int, lineas: int):
+        self.polls += 1
+        self.bytes += leidos
+        self.dropped_bytes += descartados
+        self.dropped_lines += lineas
+
+    def __str__(self) -> str:
+        return (
+            f"polls={self.polls} leidos={self.bytes}B "
+            f"descartados={self.dropped_bytes}B lineas={self.dropped_lines}"
+        )
+
+
+class LineFramer:
+    """Separador de líneas en tiempo lineal para flujos de bytes.
+
+    Los bytes se acumulan en un bytearray y se recorren desde un offset de
+    búsqueda, de modo que cada byte se examina una sola vez aunque lleguen
+    en muchos fragmentos; las líneas consumidas se descartan del frente del
+    buffer en el siguiente feed(). Si la línea parcial pendiente supera
+    max_size sin un delimitador, se descarta y se cuenta un desborde; los bytes
+    siguientes empiezan una línea nueva.
+    """
+
+    def __init__(self, delimiter: bytes = b"\n", max_size: int = 65536) -> None:
+        self.delimiter = delimiter
+        self.max_size = max_size
+        self.overflows = 0
+        self.dropped_bytes = 0
+        self._buffer = bytearray()
+        self._start = 0
+        self._scan = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer) - self._start
+
+    def clear(self):
+        self._buffer.clear()
+        self._start = self._scan = 0
+
+    def feed(self, chunk: bytes):
+        if self._start:
+            del self._buffer[: self._start]
+            self._scan -= self._start
+            self._start = 0
+
+        self._buffer += chunk
+        if len(self._buffer) - self._scan > self.max_size:
+            ultimo = self._buffer.rfind(self.delimiter, self._scan)
+            completo = ultimo + len(self.delimiter) if ultimo >= 0 else 0
+            if len(self._buffer) - completo > self.max_size:
+                self.overflows += 1
+                self.dropped_bytes += len(self._buffer) - completo
+                del self._buffer[completo:]
+                self._scan = min(self._scan, completo)
+
+    def lines(self):
+        """Genera las líneas completas recibidas, sin el delimitador."""
+        largo = len(self.delimiter)
+        while True:
+            fin = self._buffer.find(self.delimiter, self._scan)
+            if fin < 0:
+                self._scan = max(self._start, len(self._buffer) - largo + 1)
+                return
+            linea = memoryview(self._buffer)[self._start : fin].tobytes()
+            self._start = self._scan = fin + largo
+            yield linea
+
+
+class FrameBuffer:
+    """Separa un flujo de bytes en líneas completas y guarda las últimas.
+
+    Las líneas terminadas en "\n" se guardan en un buffer circular de size
+    entradas, cada una con su instante de recepción. Las tramas parciales
+    nunca se entregan, las que tienen más de stale_after segundos se
+    descartan al consultarlas y una línea que supera max_line bytes sin fin
+    de línea se descarta. feed() puede llamarse desde cualquier hilo.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        size: int = 8,
+        stale_after: float = 60,
+        max_line: int = 4096,
+    ) -> None:
+        self._name = name
+        self.stale_after = stale_after
+        self.max_line = max_line
+        self._frames = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._framer = LineFramer(b"\n", max_size=max_line)
+
+    def feed(self, chunk: bytes):
+        desbordes = self._framer.overflows
+        self._framer.feed(chunk)
+        if self._framer.overflows != desbordes:
+            registro.warning(f"{self._name}: trama sin fin de línea descartada")
+
+        ahora, fecha = time.monotonic(), datetime.now()
+        with self._lock:
+            for linea in self._framer.lines():
+                texto = linea.decode(errors="ignore").strip()
+                if texto:
+                    self._frames.append((ahora, fecha, texto))
+
+    def clear(self):
+        self._framer.clear()
+
+    def _fresh(self):
+        limite = time.monotonic() - self.stale_after
+        while self._frames and self._frames[0][0] < limite:
+            self._frames.popleft()
+
+    def latest(self) -> str:
+        """Devuelve la trama completa más reciente que todavía no se consumió,
+        o cadena vacía, y descarta las anteriores."""
+        with self._lock:
+            self._fresh()
+            texto = self._frames[-1][2] if self._frames else ""
+            self._frames.clear()
+        return texto
+
+    def frames(self) -> list:
+        """Devuelve y consume todas las tramas recientes como pares
+        (fecha de recepción, texto), de la más vieja a la más nueva."""
+        with self._lock:
+            self._fresh()
+            resultado = [(fecha, texto) for _, fecha, texto in self._frames]
+            self._frames.clear()
+        return resultado
+
+
+class SerialReader(FrameBuffer):
+    """Lector continuo de un puerto serie hacia un FrameBuffer.
+
+    Pensado para los instrumentos que transmiten solos cada pocos segundos
+    (O342M, AF22M en modo "print"): la lectura bloqueante del puerto ocurre
+    en un hilo propio, o en el IOLoop compartido si se lo asigna con
+    attach(), y el ciclo de poll solo toma las tramas ya recibidas.
+    """
+
+    def __init__(
+        self,
+        port,
+        name: str,
+        reopen_after: float = 1,
+        max_reopen_after: float = 60,
+        **kwargs,
+    ) -> None:
+        super().__init__(name, **kwargs)
+        self._port = port
+        self._running = False
+        self._thread = None
+        self._loop = None
+        self.reopen_after = reopen_after
+        self.max_reopen_after = max_reopen_after
+        self._delay = reopen_after
+
+    def attach(self, loop):
+        self.stop()
+        self._loop = loop
+        loop.register(self._port, selectors.EVENT_READ, self._on_readable)
+
+    def start(self):
+        if self._thread is None and self._loop is None:
+            self._running = True
+            self._thread = threading.Thread(
+                target=self._run, name=f"Serial-{self._name}", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 2):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._loop is not None:
+            self._loop.unregister(self._port)
+            self._loop = None
+
+    def _on_readable(self):
+        try:
+            chunk = self._port.read(self._port.in_waiting or 1)
+        except Exception as error:
+            registro.error(
+                f"{self._name}: no se pudo leer desde el puerto serie, {error}"
+            )
+            self._loop._unregister(self._port)
+            self._loop._add_timer(time.monotonic() + self._delay, self._reopen, ())
+            return
+        if chunk:
+            self.feed(chunk)
+
+    def _reopen(self):
+        if self._loop is not None:
+            self._loop.run_blocking(self._on_reopened, self._reopen_port)
+
+    def _reopen_port(self):
+        try:
+            self._port.close()
+        except Exception:
+            pass
+        self._port.open()
+
+    def _on_reopened(self, future):
+        if self._loop is None:
+            return
+        try:
+            future.result()
+        except Exception as error:
+            self._delay = min(self._delay * 2, self.max_reopen_after)
+            registro.warning(
+                f"{self._name}: no se pudo reabrir el puerto serie, {error}, "
+                f"reintento en {self._delay:.0f}s"
+            )
+            self._loop._add_timer(time.monotonic() + self._delay, self._reopen, ())
+            return
+        registro.info(f"{self._name}: puerto serie reabierto")
+        self._delay = self.reopen_after
+        self.clear()
+        self._loop._register(self._port, selectors.EVENT_READ, self._on_readable)
+
+    def _run(self):
+        while self._running:
+            try:
+                chunk = self._port.read(self._port.in_waiting or 1)
+            except Exception as error:
+                registro.error(
+                    f"{self._name}: no se pudo leer desde el puerto serie, {error}"
+                )
+                time.sleep(self._delay)
+                try:
+                    self._reopen_port()
+                    self._delay = self.reopen_after
+                    self.clear()
+                except Exception:
+                    self._delay = min(self._delay * 2, self.max_reopen_after)
+                continue
+            if chunk:
+                self.feed(chunk)
+
+
+class IOLoop:
+    """Hilo único de entrada/salida sobre selectors (epoll en Linux).
+
+    Multiplexa los puertos serie y los sockets TCP de todos los instrumentos
+    que transmiten solos: cada descriptor se registra con una función que se
+    llama cuando está listo, y los temporizadores de call_later() resuelven
+    reconexiones y watchdogs sin hilos adicionales. Los métodos públicos
+    pueden llamarse desde cualquier hilo; el trabajo se encola y se ejecuta
+    en el hilo del loop, que se despierta con un socketpair.
+    """
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._timers = []
+        self._sequence = 0
+        self._pending = deque()
+        self._running = False
+        self._thread = None
+        self._executor = None
+        self._wakeup, self._waker = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._waker.setblocking(False)
+        self._selector.register(self._wakeup, selectors.EVENT_READ, self._drain_wakeup)
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(
+                target=self._run, name="IOLoop", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 2):
+        self._running = False
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _wake(self):
+        try:
+            self._waker.send(b"\0")
+        except OSError:
+            pass
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup.recv(512):
+                pass
+        except OSError:
+            pass
+
+    def call_soon(self, callback: callable, *args):
+        self._pending.append((callback, args))
+        self._wake()
+
+    def run_blocking(self, callback: callable, function: callable, *args):
+        """Ejecuta function(*args), que puede bloquear, como una resolución
+        DNS o la apertura de un puerto, en un hilo auxiliar y le pasa el
+        future terminado a callback en el hilo del loop."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="IOLoop"
+            )
+        future = self._executor.submit(function, *args)
+        future.add_done_callback(lambda terminado: self.call_soon(callback, terminado))
+
+    def call_later(self, delay: float, callback: callable, *args):
+        self.call_soon(self._add_timer, time.monotonic() + delay, callback, args)
+
+    def _add_timer(self, when: float, callback: callable, args):
+        self._sequence += 1
+        heapq.heappush(self._timers, (when, self._sequence, callback, args))
+
+    def register(self, fileobj, events: int, callback: callable):
+        self.call_soon(self._register, fileobj, events, callback)
+
+    def _register(self, fileobj, events: int, callback: callable):
+        try:
+            self._selector.modify(fileobj, events, callback)
+        except KeyError:
+            self._selector.register(fileobj, events, callback)
+
+    def unregister(self, fileobj):
+        self.call_soon(self._unregister, fileobj)
+
+    def _unregister(self, fileobj):
+        try:
+            self._selector.unregister(fileobj)
+        except (KeyError, ValueError):
+            pass
+
+    def _run(self):
+        while self._running:
+            timeout = 1.0
+            if self._timers:
+                timeout = min(timeout, max(0.0, self._timers[0][0] - time.monotonic()))
+            for key, _ in self._selector.select(timeout):
+                self._dispatch(key.data)
+
+            while self._pending:
+                callback, args = self._pending.popleft()
+                self._dispatch(callback, *args)
+
+            ahora = time.monotonic()
+            while self._timers and self._timers[0][0] <= ahora:
+                _, _, callback, args = heapq.heappop(self._timers)
+                self._dispatch(callback, *args)
+
+        # Lo encolado antes de stop(), como el cierre de las conexiones.
+        while self._pending:
+            callback, args = self._pending.popleft()
+            self._dispatch(callback, *args)
+
+    def _dispatch(self, callback: callable, *args):
+        try:
+            callback(*args)
+        except Exception as error:
+            registro.error(f"Error en el loop de entrada/salida, {error}")
+
+
+class TcpLink:
+    """Conexión TCP de un instrumento administrada por un IOLoop.
+
+    El connect es no bloqueante: el socket se registra para escritura y la
+    conexión se completa cuando el selector lo indica. Al conectar se activa
+    el keepalive y se envía handshake; los bytes recibidos se pasan a un
+    FrameBuffer. Si el equipo cierra, falla o pasan stale_after segundos sin
+    datos, el socket se descarta y se reintenta con espera exponencial
+    entre backoff y max_backoff segundos, con una variación aleatoria de
+    ±jitter para que varios equipos no reintenten todos juntos.
+    """
+
+    def __init__(
+        self,
+        loop: IOLoop,
+        host: str,
+        port: int,
+        buffer: FrameBuffer,
+        name: str,
+        handshake: bytes = b"",
+        stale_after: float = 120,
+        backoff: float = 5,
+        max_backoff: float = 60,
+        jitter: float = 0.2,
+    ) -> None:
+        self._loop = loop
+        self._host = host
+        self._port = port
+        self._buffer = buffer
+        self._name = name
+        self.handshake = handshake
+        self.stale_after = stale_after
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self._delay = backoff
+        self._socket = None
+        self._resolving = False
+        self._last_rx_at = 0.0
+        self.connected = False
+        self._closed = False
+
+    def start(self):
+        self._closed = False
+        self._loop.call_soon(self._connect)
+
+    def close(self):
+        self._closed = True
+        self._loop.call_soon(self._drop)
+
+    def _connect(self):
+        if self._closed or self._socket is not None or self._resolving:
+            return
+        # La resolución del nombre puede tardar segundos y bloquearía a todos
+        # los equipos del loop, así que se hace en un hilo auxiliar.
+        self._resolving = True
+        self._loop.run_blocking(
+            self._on_resolved,
+            socket.getaddrinfo,
+            self._host,
+            self._port,
+            0,
+            socket.SOCK_STREAM,
+        )
+
+    def _on_resolved(self, future):
+        self._resolving = False
+        if self._closed or self._socket is not None:
+            return
+        try:
+            familia, tipo, protocolo, _, direccion = future.result()[0]
+        except (OSError, IndexError) as error:
+            self._retry(f"no se pudo resolver {self._host}, {error}")
+            return
+        s = socket.socket(familia, tipo, protocolo)
+        s.setblocking(False)
+        error = s.connect_ex(direccion)
+        if error not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            s.close()
+            self._retry(os.strerror(error))
+            return
+        self._socket = s
+        self._loop._register(s, selectors.EVENT_WRITE, self._on_connected)
+
+    def _on_connected(self):
+        error = self._socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error:
+            self._fail(os.strerror(error))
+            return
+        s = self._socket
+        # Keepalive: detectar conexiones zombie cuando el equipo se reinicia
+        # sin cerrar la sesión TCP; el watchdog cubre el caso en que la
+        # sesión sigue viva pero el equipo dejó de transmitir.
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        try:
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+        except (AttributeError, OSError):
+            pass
+        try:
+            if self.handshake:
+                s.send(self.handshake)
+        except OSError as error:
+            self._fail(str(error))
+            return
+        self.connected = True
+        self._delay = self.backoff
+        self._last_rx_at = time.monotonic()
+        self._buffer.clear()
+        self._loop._register(s, selectors.EVENT_READ, self._on_readable)
+        self._loop._add_timer(time.monotonic() + self.stale_after, self._watchdog, (s,))
+        registro.info(f"{self._name}: conectado a {self._host}:{self._port}")
+
+    def _on_readable(self):
+        try:
+            chunk = self._socket.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as error:
+            self._fail(str(error))
+            return
+        if not chunk:
+            self._fail("el equipo cerró el socket")
+            return
+        self._last_rx_at = time.monotonic()
+        self._buffer.feed(chunk)
+
+    def _watchdog(self, s):
+        if s is not self._socket:
+            return
+        espera = self._last_rx_at + self.stale_after - time.monotonic()
+        if espera <= 0:
+            self._fail(f"{self.stale_after:.0f}s sin datos")
+        else:
+            self._loop._add_timer(time.monotonic() + espera, self._watchdog, (s,))
+
+    def _drop(self):
+        if self._socket is not None:
+            self._loop._unregister(self._socket)
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = None
+        self.connected = False
+
+    def _fail(self, motivo: str):
+        registro.warning(f"{self._name}: {motivo}, reconectando")
+        self._drop()
+        self._retry(motivo)
+
+    def _retry(self, motivo: str):
+        if self._closed:
+            return
+        espera = self._delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+        registro.debug(f"{self._name}: reintento en {espera:.1f}s ({motivo})")
+        self._loop._add_timer(time.monotonic() + espera, self._connect, ())
+        self._delay = min(self._delay * 2, self.max_backoff)
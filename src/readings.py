@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+
+class Reading:
+    """Lectura de un canal convertida una sola vez al parsear la trama.
+
+    value es el número ya convertido a float, unit la unidad informada por
+    el equipo y status el estado de la medición. text conserva el número
+    tal como vino en la trama para que los archivos CSV no cambien de
+    formato; str() devuelve "texto unidad", como antes.
+    """
+
+    __slots__ = ("value", "unit", "status", "text")
+
+    def __init__(
+        self, value: float, unit: str = "", status: str = "", text: str = None
+    ) -> None:
+        self.value = value
+        self.unit = unit
+        self.status = status
+        self.text = text
+
+    @classmethod
+    def parse(cls, text: str, unit: str = "", status: str = ""):
+        """Convierte el texto de un campo; lanza ValueError si no es un
+        número."""
+        return cls(float(text), unit, status, text)
+
+    def __float__(self) -> float:
+        return self.value
+
+    def __str__(self) -> str:
+        texto = self.text if self.text is not None else repr(self.value)
+        return f"{texto} {self.unit}" if self.unit else texto
+
+    def __repr__(self) -> str:
+        return f"Reading({self.value!r}, {self.unit!r}, {self.status!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Reading):
+            return NotImplemented
+        return (self.value, self.unit, self.status) == (
+            other.value,
+            other.unit,
+            other.status,
+        )
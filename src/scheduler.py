@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import time
+import asyncio
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+registro = logging.getLogger(__name__)
+
+
+class TickMetrics:
+    """Retrasos de los ticks de una tarea periódica respecto del instante
+    de reloj que les correspondía."""
+
+    __slots__ = ("ticks", "skipped", "last", "max", "total")
+
+    def __init__(self) -> None:
+        self.ticks = 0
+        self.skipped = 0
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+
+    def add(self, late: float):
+        self.ticks += 1
+        self.last = late
+        self.total += late
+        if late > self.max:
+            self.max = late
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.ticks if self.ticks else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"ticks={self.ticks} omitidos={self.skipped} retraso "
+            f"ultimo={self.last * 1000:.1f}ms medio={self.mean * 1000:.1f}ms "
+            f"maximo={self.max * 1000:.1f}ms"
+        )
+
+
+class Scheduler:
+    """Ejecuta tareas periódicas sobre instantes absolutos del reloj.
+
+    Cada tarea se programa en los múltiplos de su período contados desde la
+    medianoche UTC más un desfasaje, por ejemplo :00, :10, :20 para un
+    período de 10 s, en lugar de dormir un tiempo fijo después de cada
+    ejecución; así la duración de la tarea no se acumula como deriva. Las
+    funciones son bloqueantes y se ejecutan en un hilo propio de cada tarea
+    para que una consulta lenta no retrase el heartbeat. Si una ejecución se
+    extiende más allá del tick siguiente, ese tick se omite y se cuenta.
+    """
+
+    def __init__(self, clock=time.time) -> None:
+        self._clock = clock
+        self._tasks = []
+        self.metrics = {}
+
+    def every(self, name: str, period: float, callback: callable, offset: float = 0):
+        self._tasks.append((name, period, callback, offset))
+        self.metrics[name] = TickMetrics()
+
+    def next_tick(self, period: float, offset: float = 0) -> float:
+        ahora = self._clock()
+        return ((ahora - offset) // period + 1) * period + offset
+
+    async def _run(self, name: str, period: float, callback: callable, offset: float):
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        metrics = self.metrics[name]
+        tick = self.next_tick(period, offset)
+        try:
+            while True:
+                await asyncio.sleep(max(0.0, tick - self._clock()))
+                metrics.add(self._clock() - tick)
+                try:
+                    await loop.run_in_executor(executor, callback)
+                except Exception as error:
+                    registro.error(f"Error en la tarea periodica {name}, {error}")
+                siguiente = self.next_tick(period, offset)
+                metrics.skipped += max(0, round((siguiente - tick) / period) - 1)
+                tick = siguiente
+        finally:
+            executor.shutdown(wait=False)
+
+    async def main(self):
+        await asyncio.gather(*(self._run(*task) for task in self._tasks))
+
+    def run(self):
+        asyncio.run(self.main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import os
+import struct
+import logging
+
+registro = logging.getLogger(__name__)
+
+RECORD = struct.Struct("<HI")
+
+
+class SegmentQueue:
+    """Cola persistente de mensajes MQTT en archivos de segmento.
+
+    Cada mensaje se agrega al último segmento "{seq:012d}.seg" del directorio
+    como un registro con el largo del tópico y del payload seguidos de ambos.
+    Cuando el segmento supera segment_size bytes se abre uno nuevo. La
+    posición de lectura se guarda en el archivo "cursor" recién cuando el
+    consumidor confirma los mensajes con commit(), así que tras un reinicio
+    se reenvía lo que no se confirmó.
+
+    Los segmentos consumidos por completo se borran. Si la cola supera
+    max_bytes se descartan los segmentos más viejos, de modo que una caída
+    del broker de varios días ocupa un espacio acotado en disco y nada en
+    memoria.
+    """
+
+    def __init__(
+        self, dir: str, segment_size: int = 1024 * 1024, max_bytes: int = 64 * 1024**2
+    ) -> None:
+        self.dir = dir
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        os.makedirs(self.dir, exist_ok=True)
+        self._segments = sorted(
+            int(archivo[:-4]) for archivo in os.listdir(dir) if archivo.endswith(".seg")
+        )
+        self._cursor = self._load_cursor()
+        self._file = None
+        if self._segments:
+            self._repair(self._path(self._segments[-1]))
+
+    def _repair(self, filename: str):
+        """Trunca el último segmento después del último registro completo,
+        por si una caída dejó a medio escribir el largo o el payload del
+        mensaje que se estaba agregando."""
+        with open(filename, "rb") as archivo:
+            datos = archivo.read()
+        fin = 0
+        while fin + RECORD.size <= len(datos):
+            largo_topic, largo_payload = RECORD.unpack_from(datos, fin)
+            siguiente = fin + RECORD.size + largo_topic + largo_payload
+            if siguiente > len(datos):
+                break
+            fin = siguiente
+        if fin < len(datos):
+            registro.warning(
+                f"Descartando {len(datos) - fin} bytes de un mensaje incompleto "
+                f"al final de {filename}"
+            )
+            os.truncate(filename, fin)
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.dir, f"{segment:012d}.seg")
+
+    @property
+    def _cursor_path(self) -> str:
+        return os.path.join(self.dir, "cursor")
+
+    def _load_cursor(self):
+        try:
+            with open(self._cursor_path, "r") as archivo:
+                segment, offset = (int(campo) for campo in archivo.read().split())
+        except (OSError, ValueError):
+            segment, offset = (self._segments[0] if self._segments else 0), 0
+        if self._segments and segment < self._segments[0]:
+            segment, offset = self._segments[0], 0
+        return segment, offset
+
+    def _save_cursor(self):
+        temporal = f"{self._cursor_path}.tmp"
+        with open(temporal, "w") as archivo:
+            archivo.write("%d %d\n" % self._cursor)
+        os.replace(temporal, self._cursor_path)
+
+    @property
+    def size(self) -> int:
+        return sum(os.path.getsize(self._path(s)) for s in self._segments)
+
+    def push(self, topic: str, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        topic = topic.encode()
+
+        if self._file is None or self._file.tell() >= self.segment_size:
+            self._roll()
+        self._file.write(RECORD.pack(len(topic), len(payload)) + topic + payload)
+        self._file.flush()
+
+    def _roll(self):
+        if self._file is not None:
+            self._file.close()
+        if not self._segments or (
+            os.path.getsize(self._path(self._segments[-1])) >= self.segment_size
+        ):
+            self._segments.append(self._segments[-1] + 1 if self._segments else 0)
+        self._file = open(self._path(self._segments[-1]), "ab")
+        self._trim()
+
+    def _trim(self):
+        while len(self._segments) > 1 and self.size > self.max_bytes:
+            segment = self._segments.pop(0)
+            registro.warning(
+                f"Cola MQTT llena, se descartan los mensajes del segmento {segment}"
+            )
+            os.remove(self._path(segment))
+            if self._cursor[0] <= segment:
+                self._cursor = (self._segments[0], 0)
+                self._save_cursor()
+
+    def peek(self, count: int):
+        """Devuelve hasta count mensajes (topic, payload, posición) desde el
+        cursor sin avanzarlo; la posición se pasa luego a commit()."""
+        resultado = []
+        segment, offset = self._cursor
+        for actual in self._segments:
+            if actual < segment or len(resultado) >= count:
+                continue
+            if actual > segment:
+                offset = 0
+            with open(self._path(actual), "rb") as archivo:
+                archivo.seek(offset)
+                while len(resultado) < count:
+                    cabecera = archivo.read(RECORD.size)
+                    if len(cabecera) < RECORD.size:
+                        break
+                    largo_topic, largo_payload = RECORD.unpack(cabecera)
+                    topic = archivo.read(largo_topic)
+                    payload = archivo.read(largo_payload)
+                    if len(payload) < largo_payload:
+                        break
+                    resultado.append(
+                        (topic.decode(), payload, (actual, archivo.tell()))
+                    )
+        return resultado
+
+    def commit(self, posicion):
+        self._cursor = posicion
+        self._save_cursor()
+        while len(self._segments) > 1 and self._segments[0] < posicion[0]:
+            os.remove(self._path(self._segments.pop(0)))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
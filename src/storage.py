@@ -0,0 +1,819 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import os
+import sys
+import gzip
+import json
+import zlib
+import queue
+import math
+import time
+import struct
+import shutil
+import logging
+import threading
+
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from readings import Reading
+
+registro = logging.getLogger(__name__)
+
+
+class CsvWriter:
+    """Archivo de registro CSV de un analizador que permanece abierto.
+
+    Antes cada lectura aceptada verificaba la existencia del archivo y del
+    directorio de publicación, abría "{name}.csv", escribía una línea y lo
+    cerraba, con la actualización de metadatos que eso implica en la tarjeta
+    SD. Esta clase mantiene el archivo abierto, recuerda si el directorio de
+    publicación ya existe y acumula las filas hasta que se juntan flush_rows
+    o pasan flush_interval segundos desde la última descarga.
+
+    Las filas llegan con su propia fecha, de modo que la rotación mensual y
+    la publicación diaria se deciden fila por fila: antes de aceptar la
+    primera fila de un día o mes nuevo se descargan las pendientes y luego se
+    publica o se rota el archivo.
+
+    La publicación diaria es incremental: el archivo publicado es siempre un
+    prefijo del archivo local, así que solo se le agregan los bytes escritos
+    desde la publicación anterior. La posición alcanzada se guarda en
+    ".{name}.publish" junto al archivo local y se descarta si el publicado
+    no coincide con ella, en cuyo caso se vuelve a copiar completo.
+
+    Junto a cada CSV se mantiene un índice "{name}.idx" con una línea
+    "fecha hora offset" por cada intervalo de index_interval segundos que
+    tiene datos, apuntando al byte de la primera fila del intervalo. El
+    índice se publica y se rota junto con el CSV y permite que read_range
+    vaya directo a la posición buscada en lugar de recorrer todo el mes.
+
+    Si se asigna un compressor, cada archivo rotado se le entrega para que
+    lo comprima en segundo plano.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        header: str,
+        serializer: callable,
+        dir: str = "",
+        flush_rows: int = 1,
+        flush_interval: float = 0,
+        index_interval: int = 600,
+        compressor=None,
+    ) -> None:
+        self._name = name
+        self._header = header
+        self._serializer = serializer
+        self.dir = dir
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.index_interval = index_interval
+        self.compressor = compressor
+        self._file = None
+        self._pending = []
+        self._index = None
+        self._pending_index = []
+        self._bucket = None
+        self._offset = 0
+        self._last_data = None
+        self._dir_ready = False
+        self._flushed_at = time.monotonic()
+        # maintenance() descarga desde el hilo del planificador mientras el
+        # poll puede estar agregando filas.
+        self._lock = threading.RLock()
+
+    @property
+    def filename(self) -> str:
+        return f"{self._name}.csv"
+
+    @property
+    def index_filename(self) -> str:
+        return f"{self._name}.idx"
+
+    def _published(self, fecha, extension: str = "csv") -> str:
+        return f"{self.dir}/{self._name}-{fecha.year}-{fecha.month}.{extension}"
+
+    @property
+    def offset_filename(self) -> str:
+        return f".{self._name}.publish"
+
+    def _ensure_dir(self):
+        if not self._dir_ready:
+            os.makedirs(self.dir, exist_ok=True)
+            self._dir_ready = True
+
+    def _open(self):
+        new = not os.path.isfile(self.filename)
+        self._file = open(self.filename, "a", newline="")
+        self._offset = 0 if new else os.path.getsize(self.filename)
+        if new:
+            self._file.write(f"{self._header}\r\n")
+            self._offset += len(self._header.encode()) + 2
+        if self.index_interval:
+            self._index = open(self.index_filename, "w" if new else "a")
+        self._bucket = None
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    def _load_offset(self, destino: str) -> int:
+        try:
+            with open(self.offset_filename, "r") as archivo:
+                ruta, offset = archivo.read().split("\n")[:2]
+            offset = int(offset)
+        except (OSError, ValueError):
+            return 0
+        if ruta != destino or not os.path.isfile(destino):
+            return 0
+        if os.path.getsize(self.filename) < offset:
+            return 0
+        if os.path.getsize(destino) != offset:
+            registro.warning(
+                f"El archivo publicado {destino} no coincide con el registro, "
+                f"se vuelve a copiar completo"
+            )
+            return 0
+        return offset
+
+    def _save_offset(self, destino: str, offset: int):
+        temporal = f"{self.offset_filename}.tmp"
+        with open(temporal, "w") as archivo:
+            archivo.write(f"{destino}\n{offset}\n")
+        os.replace(temporal, self.offset_filename)
+
+    def _rotate(self):
+        registro.debug(f"Rotando el archivo de log por cambio de mes")
+        self.flush()
+        self._close()
+        self._ensure_dir()
+        destino = self._published(self._last_data)
+        os.replace(self.filename, destino)
+        if os.path.isfile(self.index_filename):
+            os.replace(self.index_filename, self._published(self._last_data, "idx"))
+        if os.path.isfile(self.offset_filename):
+            os.remove(self.offset_filename)
+        if self.compressor is not None:
+            self.compressor.submit(destino)
+
+    def _publish(self):
+        registro.debug(f"Publicando el archivo de log por cambio de dia")
+        self.flush()
+        self._ensure_dir()
+        destino = self._published(self._last_data)
+        offset = self._load_offset(destino)
+        with open(self.filename, "rb") as origen:
+            origen.seek(offset)
+            with open(destino, "ab" if offset else "wb") as copia:
+                shutil.copyfileobj(origen, copia)
+                offset = copia.tell()
+        self._save_offset(destino, offset)
+        if os.path.isfile(self.index_filename):
+            shutil.copy(self.index_filename, self._published(self._last_data, "idx"))
+
+    def _append(self, values: dict, fecha: datetime):
+        if self._last_data:
+            if (self._last_data.year, self._last_data.month) != (
+                fecha.year,
+                fecha.month,
+            ):
+                self._rotate()
+            elif self._last_data.day != fecha.day:
+                self._publish()
+
+        if self._file is None:
+            self._open()
+        fila = f"{self._serializer(values, fecha)}\r\n"
+        if self._index is not None:
+            bucket = _bucket(fecha, self.index_interval)
+            if bucket != self._bucket:
+                self._pending_index.append(f"{bucket} {self._offset}\n")
+                self._bucket = bucket
+        self._pending.append(fila)
+        self._offset += len(fila.encode())
+        self._last_data = fecha
+
+    def write(self, values: dict, fecha: datetime):
+        with self._lock:
+            self._append(values, fecha)
+            self._flush_due()
+
+    def write_many(self, rows: list):
+        """Escribe una tanda de filas (values, fecha) en orden y decide el
+        flush una sola vez al final."""
+        with self._lock:
+            for values, fecha in rows:
+                self._append(values, fecha)
+            self._flush_due()
+
+    def _flush_due(self):
+        if (
+            len(self._pending) >= self.flush_rows
+            or time.monotonic() - self._flushed_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush_due(self):
+        """Descarga las filas pendientes si venció flush_interval aunque no
+        lleguen filas nuevas. Se llama en cada ciclo de poll, así el
+        intervalo es la demora máxima hasta que una fila llega al disco."""
+        with self._lock:
+            if self._pending:
+                self._flush_due()
+
+    def flush(self):
+        with self._lock:
+            if self._pending and self._file is not None:
+                self._file.write("".join(self._pending))
+                self._pending = []
+            if self._file is not None:
+                self._file.flush()
+            if self._pending_index and self._index is not None:
+                self._index.write("".join(self._pending_index))
+                self._pending_index = []
+                self._index.flush()
+            self._flushed_at = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._close()
+
+
+def _bucket(fecha: datetime, interval: int) -> str:
+    segundos = (fecha.hour * 3600 + fecha.minute * 60 + fecha.second) // interval
+    segundos *= interval
+    return "%04d-%02d-%02d %02d:%02d:%02d" % (
+        fecha.year,
+        fecha.month,
+        fecha.day,
+        segundos // 3600,
+        segundos // 60 % 60,
+        segundos % 60,
+    )
+
+
+def _load_index(filename: str):
+    claves, offsets = [], []
+    try:
+        with open(filename, "r") as archivo:
+            for linea in archivo:
+                partes = linea.rsplit(" ", 1)
+                if len(partes) != 2:
+                    continue
+                # Tras un reinicio el mismo intervalo puede aparecer dos veces,
+                # la primera aparición es la que apunta a su primera fila.
+                if claves and claves[-1] >= partes[0]:
+                    continue
+                claves.append(partes[0])
+                offsets.append(int(partes[1]))
+    except (OSError, ValueError):
+        return [], []
+    return claves, offsets
+
+
+def _months(start: datetime, end: datetime):
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _live_month(name: str):
+    """Mes "YYYY-MM" del archivo local que el writer todavía no rotó, según
+    la primera clave de su índice, o None si no se puede saber."""
+    claves, _ = _load_index(f"{name}.idx")
+    if claves and os.path.isfile(f"{name}.csv"):
+        return claves[0][:7]
+    return None
+
+
+def _csv_sources(dir: str, name: str, start: datetime, end: datetime):
+    vivo = _live_month(name)
+    for year, month in _months(start, end):
+        if vivo == "%04d-%02d" % (year, month):
+            yield f"{name}.csv", f"{name}.idx"
+        else:
+            yield f"{dir}/{name}-{year}-{month}.csv", f"{dir}/{name}-{year}-{month}.idx"
+
+
+def _open_archive(filename: str):
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rb")
+    return open(filename, "rb")
+
+
+def read_range(dir: str, name: str, start: datetime, end: datetime):
+    """Genera las filas del registro CSV del analizador con fecha en
+    [start, end), como listas de campos ["Fecha", "Hora", ...].
+
+    Recorre los archivos mensuales publicados en dir, o el archivo local si
+    corresponde al mes en curso, y usa su índice para saltar directamente al
+    intervalo que contiene start. Sin índice el archivo se recorre completo.
+    Los archivos comprimidos ".csv.gz" se leen de forma transparente: los
+    que generó Compressor tienen un miembro gzip por intervalo y un índice
+    "{archivo}.gz.idx" con sus offsets comprimidos, de modo que el salto
+    tampoco descomprime lo anterior. Con un gzip de un solo miembro el
+    índice del CSV sigue siendo válido pero el salto descomprime el prefijo.
+    """
+    desde = start.strftime("%Y-%m-%d %H:%M:%S")
+    hasta = end.strftime("%Y-%m-%d %H:%M:%S")
+
+    for filename, index in _csv_sources(dir, name, start, end):
+        if not os.path.isfile(filename):
+            filename = f"{filename}.gz"
+            if not os.path.isfile(filename):
+                continue
+        miembros = filename.endswith(".gz") and os.path.isfile(f"{filename}.idx")
+        claves, offsets = _load_index(f"{filename}.idx" if miembros else index)
+        posicion = bisect_right(claves, desde) - 1
+        offset = offsets[posicion] if posicion >= 0 else 0
+
+        with open(filename, "rb") as crudo:
+            if miembros:
+                crudo.seek(offset)
+                archivo = gzip.GzipFile(fileobj=crudo, mode="rb")
+            elif filename.endswith(".gz"):
+                archivo = gzip.GzipFile(fileobj=crudo, mode="rb")
+                archivo.seek(offset)
+            else:
+                archivo = crudo
+                archivo.seek(offset)
+            for linea in archivo:
+                campos = linea.decode(errors="ignore").strip()[1:-1].split('","')
+                if len(campos) < 2 or campos[0] == "Fecha":
+                    continue
+                fecha = f"{campos[0]} {campos[1]}"
+                if fecha >= hasta:
+                    return
+                if fecha >= desde:
+                    yield campos
+
+
+def rebuild_index(filename: str, interval: int = 600) -> str:
+    """Reconstruye el índice de un archivo CSV de registro existente y
+    devuelve el nombre del índice generado."""
+    base = filename[:-3] if filename.endswith(".gz") else filename
+    index = f"{os.path.splitext(base)[0]}.idx"
+    anterior = None
+    with _open_archive(filename) as archivo, open(index, "w") as salida:
+        offset = 0
+        for linea in archivo:
+            campos = linea.decode(errors="ignore").strip()[1:-1].split('","')
+            if len(campos) >= 2 and campos[0] != "Fecha":
+                try:
+                    fecha = datetime.strptime(
+                        f"{campos[0]} {campos[1]}", "%Y-%m-%d %H:%M:%S"
+                    )
+                except ValueError:
+                    fecha = None
+                if fecha is not None:
+                    bucket = _bucket(fecha, interval)
+                    if bucket != anterior:
+                        salida.write(f"{bucket} {offset}\n")
+                        anterior = bucket
+            offset += len(linea)
+    return index
+
+
+# Sufijo con que Compressor reserva el archivo que está comprimiendo.
+CLAIMED = ".comprimiendo"
+
+
+class Compressor:
+    """Comprime con gzip los archivos mensuales rotados en un hilo propio.
+
+    Los archivos se encolan con submit() y el hilo, con prioridad baja, los
+    comprime por bloques a un temporal, verifica que el resultado
+    descomprimido tenga el mismo tamaño y CRC que el original, y recién
+    entonces lo renombra a "{archivo}.gz" y borra el original. El ciclo de
+    poll nunca espera por este trabajo.
+    """
+
+    def __init__(self, level: int = 6, chunk: int = 256 * 1024) -> None:
+        self.level = level
+        self.chunk = chunk
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._queued_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="Compressor", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = None):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, filename: str):
+        """Encola un archivo para comprimir, salvo que ya esté esperando o
+        comprimiéndose."""
+        with self._queued_lock:
+            if filename in self._queued:
+                return
+            self._queued.add(filename)
+        self._queue.put(filename)
+
+    def scan(self, dir: str, fecha: datetime):
+        """Encola los archivos mensuales de dir anteriores al mes de fecha que
+        todavía no se comprimieron, por ejemplo tras un reinicio.
+
+        Se saltean los meses que el writer todavía no rotó: su archivo en dir
+        es solo la copia diaria, un prefijo que la rotación va a reemplazar
+        con el mes completo y entregar ella misma al compresor. Los archivos
+        que una compresión interrumpida dejó reservados vuelven a su nombre.
+        """
+        if not dir or not os.path.isdir(dir):
+            return
+        actual = (fecha.year, fecha.month)
+        for archivo in sorted(os.listdir(dir)):
+            ruta = os.path.join(dir, archivo)
+            if archivo.endswith(f".csv{CLAIMED}"):
+                original = ruta[: -len(CLAIMED)]
+                if not os.path.exists(original):
+                    os.replace(ruta, original)
+                    archivo = archivo[: -len(CLAIMED)]
+                    ruta = original
+            partes = archivo[:-4].rsplit("-", 2) if archivo.endswith(".csv") else []
+            try:
+                if len(partes) != 3:
+                    continue
+                mes = (int(partes[1]), int(partes[2]))
+            except ValueError:
+                continue
+            if mes < actual and _live_month(partes[0]) != "%04d-%02d" % mes:
+                self.submit(ruta)
+
+    def _run(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            filename = self._queue.get()
+            if filename is None:
+                break
+            try:
+                self.compress(filename)
+            except Exception as error:
+                registro.error(f"No se pudo comprimir el archivo {filename}, {error}")
+
+    def compress(self, filename: str) -> str:
+        """Comprime el archivo como una serie de miembros gzip, uno por cada
+        intervalo de su índice si lo tiene, y guarda en "{archivo}.gz.idx"
+        el offset comprimido donde empieza cada uno. Así read_range puede
+        saltar al intervalo buscado sin descomprimir todo lo anterior.
+
+        Antes de leerlo el archivo se renombra a un nombre propio: si mientras
+        tanto la rotación deja otro archivo en la misma ruta, se encola de
+        nuevo y al terminar solo se borra la copia que se comprimió."""
+        destino = f"{filename}.gz"
+        temporal = f"{destino}.tmp"
+        reservado = f"{filename}{CLAIMED}"
+        try:
+            os.replace(filename, reservado)
+        finally:
+            with self._queued_lock:
+                self._queued.discard(filename)
+        try:
+            self._compress(reservado, filename, destino, temporal)
+        except BaseException:
+            if not os.path.exists(filename):
+                os.replace(reservado, filename)
+            raise
+        os.remove(reservado)
+        registro.info(f"Archivo {filename} comprimido en {destino}")
+        return destino
+
+    def _compress(self, fuente: str, filename: str, destino: str, temporal: str):
+        claves, offsets = _load_index(f"{os.path.splitext(filename)[0]}.idx")
+        if any(b <= a for a, b in zip(offsets, offsets[1:])):
+            claves, offsets = [], []
+        cortes = list(zip(claves, offsets))
+        miembros = []
+        crc, size = 0, 0
+        with open(fuente, "rb") as origen, open(temporal, "wb") as crudo:
+            for indice, (clave, inicio) in enumerate([(None, 0)] + cortes):
+                fin = offsets[indice] if indice < len(offsets) else None
+                if fin is not None and fin <= inicio:
+                    continue
+                if clave is not None:
+                    miembros.append(f"{clave} {crudo.tell()}\n")
+                with gzip.GzipFile(
+                    fileobj=crudo, mode="wb", compresslevel=self.level
+                ) as salida:
+                    while fin is None or origen.tell() < fin:
+                        largo = self.chunk
+                        if fin is not None:
+                            largo = min(largo, fin - origen.tell())
+                        bloque = origen.read(largo)
+                        if not bloque:
+                            break
+                        crc = zlib.crc32(bloque, crc)
+                        size += len(bloque)
+                        salida.write(bloque)
+
+        verificado, total = 0, 0
+        with gzip.open(temporal, "rb") as entrada:
+            while True:
+                bloque = entrada.read(self.chunk)
+                if not bloque:
+                    break
+                verificado = zlib.crc32(bloque, verificado)
+                total += len(bloque)
+        if (verificado, total) != (crc, size):
+            os.remove(temporal)
+            raise ValueError("el archivo comprimido no coincide con el original")
+
+        os.replace(temporal, destino)
+        if miembros:
+            with open(f"{destino}.idx.tmp", "w") as indice:
+                indice.write("".join(miembros))
+            os.replace(f"{destino}.idx.tmp", f"{destino}.idx")
+        elif os.path.isfile(f"{destino}.idx"):
+            os.remove(f"{destino}.idx")
+
+
+MAGIC = b"DLTS"
+VERSION = 1
+PREFIX = struct.Struct("<4sHHI")
+
+
+def to_float(value) -> float:
+    if value is None:
+        return math.nan
+    if isinstance(value, (int, float, Reading)):
+        return float(value)
+    try:
+        return float(str(value).split()[0])
+    except (ValueError, IndexError):
+        return math.nan
+
+
+class BinaryWriter:
+    """Serie temporal binaria de un analizador con registros de ancho fijo.
+
+    Cada registro es la fecha en segundos epoch seguida de un float64 por
+    cada entrada de COLUMNS, NaN cuando el valor falta o no es numérico,
+    todo en little-endian. El archivo comienza con un encabezado que
+    describe el esquema (nombre, columnas y tamaño de registro) en JSON.
+
+    Los archivos se particionan por mes como "{dir}/{name}-{year}-{month}.bin"
+    y solo se les agregan registros, así que no hace falta rotarlos ni
+    publicarlos. La política de descarga es la misma que la de CsvWriter.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        columns,
+        dir: str = "",
+        flush_rows: int = 1,
+        flush_interval: float = 0,
+    ) -> None:
+        self._name = name
+        self._columns = tuple(columns)
+        self._record = struct.Struct(f"<{len(self._columns) + 1}d")
+        self.dir = dir
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._file = None
+        self._partition = None
+        self._pending = bytearray()
+        self._pending_rows = 0
+        self._flushed_at = time.monotonic()
+        self._lock = threading.RLock()
+
+    def _filename(self, fecha: datetime) -> str:
+        return f"{self.dir}/{self._name}-{fecha.year}-{fecha.month}.bin"
+
+    def _open(self, fecha: datetime):
+        os.makedirs(self.dir, exist_ok=True)
+        filename = self._filename(fecha)
+        if os.path.isfile(filename) and os.path.getsize(filename):
+            try:
+                schema, inicio = _read_header(filename)
+                columnas = tuple(schema["columns"])
+            except (ValueError, KeyError, struct.error) as error:
+                columnas, motivo = None, f"no se puede leer ({error})"
+            else:
+                motivo = f"tiene las columnas {list(columnas)}"
+            if columnas != self._columns:
+                self._set_aside(filename, motivo)
+        if os.path.isfile(filename) and os.path.getsize(filename):
+            # Un corte de energía puede dejar un registro a medio escribir al
+            # final; se descarta para que los siguientes queden alineados.
+            size = os.path.getsize(filename)
+            sobrante = (size - inicio) % self._record.size
+            if sobrante:
+                registro.warning(
+                    f"Descartando {sobrante} bytes de un registro incompleto al "
+                    f"final de {filename}"
+                )
+                os.truncate(filename, size - sobrante)
+            self._file = open(filename, "ab")
+        else:
+            self._file = open(filename, "wb")
+            self._file.write(_make_header(self._name, self._columns))
+        self._partition = (fecha.year, fecha.month)
+
+    def _set_aside(self, filename: str, motivo):
+        """Aparta una partición que no se puede continuar con el esquema
+        actual, por ejemplo tras cambiar las columnas del analizador, para
+        empezar una nueva sin perder los registros ni cortar el poll."""
+        sufijo = 1
+        while os.path.exists(f"{filename}.{sufijo}"):
+            sufijo += 1
+        registro.error(
+            f"El archivo {filename} {motivo}, se aparta como {filename}.{sufijo} "
+            f"y se empieza una partición nueva"
+        )
+        os.replace(filename, f"{filename}.{sufijo}")
+
+    def _append(self, values: dict, fecha: datetime):
+        if self._partition != (fecha.year, fecha.month):
+            self.close()
+            self._open(fecha)
+
+        self._pending += self._record.pack(
+            fecha.timestamp(),
+            *(to_float(values.get(column)) for column in self._columns),
+        )
+        self._pending_rows += 1
+
+    def write(self, values: dict, fecha: datetime):
+        with self._lock:
+            self._append(values, fecha)
+            self._flush_due()
+
+    def write_many(self, rows: list):
+        """Escribe una tanda de registros (values, fecha) en orden y decide
+        el flush una sola vez al final."""
+        with self._lock:
+            for values, fecha in rows:
+                self._append(values, fecha)
+            self._flush_due()
+
+    def _flush_due(self):
+        if (
+            self._pending_rows >= self.flush_rows
+            or time.monotonic() - self._flushed_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush_due(self):
+        """Igual que CsvWriter.flush_due()."""
+        with self._lock:
+            if self._pending_rows:
+                self._flush_due()
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                if self._pending:
+                    self._file.write(self._pending)
+                    self._pending = bytearray()
+                    self._pending_rows = 0
+                self._file.flush()
+            self._flushed_at = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._partition = None
+
+
+def _make_header(name: str, columns) -> bytes:
+    schema = json.dumps(
+        {
+            "name": name,
+            "columns": list(columns),
+            "timestamp": "epoch",
+            "dtype": "<f8",
+            "record_size": 8 * (len(columns) + 1),
+        }
+    ).encode()
+    return PREFIX.pack(MAGIC, VERSION, len(columns), len(schema)) + schema
+
+
+def _read_header(filename: str):
+    with open(filename, "rb") as archivo:
+        magic, version, _, size = PREFIX.unpack(archivo.read(PREFIX.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"El archivo {filename} no es una serie binaria valida")
+        schema = json.loads(archivo.read(size))
+    return schema, PREFIX.size + size
+
+
+def _partitions(dir: str, name: str, start: datetime, end: datetime):
+    for year, month in _months(start, end):
+        yield f"{dir}/{name}-{year}-{month}.bin"
+
+
+def read_binary(dir: str, name: str, start: datetime, end: datetime) -> dict:
+    """Devuelve los registros con fecha en [start, end) de las particiones
+    binarias del analizador como un diccionario de array("d") por columna,
+    más la clave "ts" con las fechas epoch. Los arrays exponen el protocolo
+    buffer, de modo que numpy.frombuffer los envuelve sin copiarlos.
+
+    Cada partición se recorre con búsqueda binaria sobre los registros de
+    ancho fijo, así que solo se leen los bytes del rango pedido.
+    """
+    desde, hasta = start.timestamp(), end.timestamp()
+    resultado = None
+
+    for filename in _partitions(dir, name, start, end):
+        if not os.path.isfile(filename):
+            continue
+        schema, inicio = _read_header(filename)
+        columns = ["ts"] + schema["columns"]
+        size = schema["record_size"]
+        if resultado is None:
+            resultado = {column: array("d") for column in columns}
+
+        with open(filename, "rb") as archivo:
+            total = (os.path.getsize(filename) - inicio) // size
+
+            def fecha(indice):
+                archivo.seek(inicio + indice * size)
+                return struct.unpack("<d", archivo.read(8))[0]
+
+            def buscar(limite):
+                bajo, alto = 0, total
+                while bajo < alto:
+                    medio = (bajo + alto) // 2
+                    if fecha(medio) < limite:
+                        bajo = medio + 1
+                    else:
+                        alto = medio
+                return bajo
+
+            primero, ultimo = buscar(desde), buscar(hasta)
+            archivo.seek(inicio + primero * size)
+            datos = array("d")
+            datos.frombytes(archivo.read((ultimo - primero) * size))
+
+        if sys.byteorder == "big":
+            datos.byteswap()
+        for indice, column in enumerate(columns):
+            resultado[column].extend(datos[indice :: len(columns)])
+
+    return resultado or {"ts": array("d")}
+
+
+def export_csv(dir: str, name: str, start: datetime, end: datetime, destino):
+    """Exporta un rango de la serie binaria con el formato de los CSV de
+    registro, escribiendo "NA" en lugar de NaN."""
+    datos = read_binary(dir, name, start, end)
+    columns = [column for column in datos if column != "ts"]
+    destino.write(
+        '"Fecha","Hora"' + "".join(f',"{column}"' for column in columns) + "\r\n"
+    )
+    for indice, ts in enumerate(datos["ts"]):
+        fila = datetime.strftime(datetime.fromtimestamp(ts), '"%Y-%m-%d","%H:%M:%S"')
+        for column in columns:
+            valor = datos[column][indice]
+            fila += ',"NA"' if math.isnan(valor) else f',"{valor:g}"'
+        destino.write(fila + "\r\n")
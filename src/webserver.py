@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import io
+import asyncio
+import logging
+import threading
+
+from http import HTTPStatus
+
+registro = logging.getLogger(__name__)
+
+
+class Request:
+    """Petición HTTP con la misma interfaz que usa un BaseHTTPRequestHandler
+    para responder (send_response, send_header, end_headers y wfile), así
+    los manejadores escritos para http.server funcionan sin cambios. La
+    respuesta se arma en memoria y el servidor la envía completa."""
+
+    def __init__(
+        self, command: str, path: str, version: str, headers: dict, client_address
+    ) -> None:
+        self.command = command
+        self.path = path
+        self.request_version = version
+        self.headers = headers
+        self.client_address = client_address
+        self.wfile = io.BytesIO()
+        self._status = None
+        self._headers = []
+
+    def send_response(self, code: int, message: str = None):
+        self._status = (code, message or HTTPStatus(code).phrase)
+
+    def send_header(self, keyword: str, value: str):
+        self._headers.append((keyword, str(value)))
+
+    def end_headers(self):
+        pass
+
+    @property
+    def keep_alive(self) -> bool:
+        conexion = self.headers.get("connection", "").lower()
+        if self.request_version == "HTTP/1.1":
+            return conexion != "close"
+        return conexion == "keep-alive"
+
+    def response(self, keep_alive: bool) -> bytes:
+        code, message = self._status or (500, HTTPStatus(500).phrase)
+        body = self.wfile.getvalue()
+        lineas = [f"HTTP/1.1 {code} {message}"]
+        lineas += [f"{keyword}: {value}" for keyword, value in self._headers]
+        lineas.append(f"Content-Length: {len(body)}")
+        lineas.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        return ("\r\n".join(lineas) + "\r\n\r\n").encode("latin-1") + body
+
+
+class HttpServer:
+    """Servidor HTTP mínimo sobre asyncio para recibir updates de equipos.
+
+    Todas las conexiones se atienden en un único hilo con un event loop, en
+    lugar de un hilo del sistema por petición. Soporta keep-alive y admite
+    a lo sumo max_connections conexiones simultáneas: las que exceden el
+    cupo esperan hasta timeout segundos por un lugar y si no lo obtienen
+    reciben un 503; mientras haya conexiones esperando, las que están en
+    keep-alive se cierran después de cada respuesta para liberar su lugar.
+    Una petición que no se completa en timeout segundos, o una conexión en
+    keep-alive sin peticiones durante keepalive_timeout, se cierra.
+
+    handler recibe un Request y se ejecuta en el hilo del loop, por lo que
+    no debe bloquear.
+    """
+
+    def __init__(
+        self,
+        bind: str,
+        port: int,
+        handler: callable,
+        name: str,
+        max_connections: int = 16,
+        timeout: float = 15,
+        keepalive_timeout: float = 5,
+        max_line: int = 8192,
+        max_headers: int = 64,
+    ) -> None:
+        self._bind = bind
+        self._port = port
+        self._handler = handler
+        self._name = name
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.max_line = max_line
+        self.max_headers = max_headers
+        self.connections = 0
+        self.waiting = 0
+        self.requests = 0
+        self.rejected = 0
+        self._loop = None
+        self._stopping = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+    @property
+    def port(self) -> int:
+        return self._port
+
+    def start(self):
+        """Arranca el hilo del servidor y espera a que el socket esté
+        escuchando; los errores de bind se propagan al llamador."""
+        self._thread = threading.Thread(
+            target=lambda: asyncio.run(self._serve()), name=self._name, daemon=True
+        )
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            self._thread = None
+            raise self._error
+
+    def stop(self, timeout: float = 2):
+        if self._loop is not None and self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_connections)
+        try:
+            server = await asyncio.start_server(
+                self._client, self._bind, self._port, limit=self.max_line
+            )
+        except OSError as error:
+            self._error = error
+            self._ready.set()
+            return
+        self._port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await self._stopping.wait()
+
+    async def _client(self, reader, writer):
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.waiting -= 1
+            self.rejected += 1
+            registro.warning(f"{self._name}: sin lugar para una conexión nueva")
+            writer.write(
+                b"HTTP/1.1 503 Service Unavailable\r\n"
+                b"Content-Length: 0\r\nConnection: close\r\n\r\n"
+            )
+            await self._close(writer)
+            return
+
+        self.waiting -= 1
+        self.connections += 1
+        espera = self.timeout
+        try:
+            while True:
+                peticion = await asyncio.wait_for(
+                    self._read_request(reader, writer), espera
+                )
+                if peticion is None:
+                    break
+                self.requests += 1
+                if peticion.command == "GET":
+                    self._handler(peticion)
+                else:
+                    peticion.send_response(501)
+                seguir = peticion.keep_alive and not self.waiting
+                writer.write(peticion.response(seguir))
+                await writer.drain()
+                if not seguir:
+                    break
+                espera = self.keepalive_timeout
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError:
+            # Línea más larga que max_line: StreamReader corta el flujo.
+            writer.write(
+                b"HTTP/1.1 414 URI Too Long\r\n"
+                b"Content-Length: 0\r\nConnection: close\r\n\r\n"
+            )
+        finally:
+            self.connections -= 1
+            self._slots.release()
+            await self._close(writer)
+
+    async def _read_request(self, reader, writer):
+        linea = await reader.readline()
+        while linea in (b"\r\n", b"\n"):
+            linea = await reader.readline()
+        if not linea:
+            return None
+        partes = linea.decode("latin-1").split()
+        if len(partes) != 3:
+            return None
+        command, path, version = partes
+
+        headers = {}
+        for _ in range(self.max_headers):
+            linea = await reader.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            clave, _, valor = linea.decode("latin-1").partition(":")
+            headers[clave.strip().lower()] = valor.strip()
+        else:
+            return None
+
+        largo = int(headers.get("content-length", 0) or 0)
+        if largo > self.max_line:
+            return None
+        if largo:
+            await reader.readexactly(largo)
+
+        return Request(
+            command, path, version, headers, writer.get_extra_info("peername")
+        )
+
+    @staticmethod
+    async def _close(writer):
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Comparación de tamaño y velocidad de los payloads NDATA.
+
+Arma un NDATA con todos los canales de los analizadores de sample.yaml y lo
+codifica como el JSON actual y en binario con float32 y float64, tanto para
+un mensaje por minuto como para una tanda de muestras. Reporta bytes por
+mensaje y cuántas veces por segundo se codifica y decodifica cada tanda.
+
+Uso:
+    python tests/bench_ndata.py
+    python tests/bench_ndata.py --mensajes 50000 --tanda 60
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from analyzers import O341M, AF22M, EcoPhysicsNOx, GrimmEDM264, WeatherUnderground
+from ndata import NdataCodec
+
+MAC = "b8:27:eb:12:34:56"
+TS = 1700000000
+
+
+def valores() -> dict:
+    columnas = []
+    for clase in (O341M, AF22M, EcoPhysicsNOx, GrimmEDM264, WeatherUnderground):
+        columnas += clase.COLUMNS
+    return {columna: 10.0 + indice * 1.37 for indice, columna in enumerate(columnas)}
+
+
+def medir(funcion, mensajes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(mensajes):
+        funcion()
+    return mensajes / (time.perf_counter() - inicio)
+
+
+def json_encode(muestras) -> list:
+    return [
+        json.dumps({"meta": {"ts": ts, "mac": MAC}, **values}).encode()
+        for ts, values in muestras
+    ]
+
+
+def json_decode(payloads: list) -> list:
+    return [json.loads(payload) for payload in payloads]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark de payloads NDATA")
+    p.add_argument("--mensajes", type=int, default=20000)
+    p.add_argument("--tanda", type=int, default=10)
+    args = p.parse_args()
+
+    values = valores()
+    print(f"{len(values)} canales, el JSON lleva un mensaje por muestra")
+    print(
+        f"{'Formato':12s} {'muestras':>8s} {'bytes':>8s} "
+        f"{'codificar (por s)':>18s} {'decodificar (por s)':>20s}"
+    )
+    for cantidad in (1, args.tanda):
+        muestras = [(TS + 60 * n, values) for n in range(cantidad)]
+        payloads = json_encode(muestras)
+        codificar = medir(lambda: json_encode(muestras), args.mensajes)
+        decodificar = medir(lambda: json_decode(payloads), args.mensajes)
+        print(
+            f"{'json':12s} {cantidad:8d} {sum(map(len, payloads)):8d} "
+            f"{codificar:18.0f} {decodificar:20.0f}"
+        )
+        for double in (False, True):
+            codec = NdataCodec(values, double=double)
+            payload = codec.encode(muestras)
+            codificar = medir(lambda: codec.encode(muestras), args.mensajes)
+            decodificar = medir(lambda: codec.decode(payload), args.mensajes)
+            nombre = "binario f8" if double else "binario f4"
+            print(
+                f"{nombre:12s} {cantidad:8d} {len(payload):8d} "
+                f"{codificar:18.0f} {decodificar:20.0f}"
+            )
+    esquema = json.dumps(NdataCodec(values).schema())
+    print(f"Esquema anunciado una vez en el NBIRTH: {len(esquema)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Benchmark de la recepción de tramas del Grimm.
+
+Alimenta ráfagas de varios MB en fragmentos del tamaño de un recv() y
+compara la concatenación de bytes con split() anterior contra LineFramer,
+que recorre cada byte una sola vez.
+
+Uso:
+    python tests/bench_recepcion.py
+    python tests/bench_recepcion.py --megas 1 4 16 --fragmento 4096
+    python tests/bench_recepcion.py --megas 64 --limite-original 0
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from readers import LineFramer
+
+LINEA = (
+    b"N_     17.2      9.2      5.6      4.7      4.0      4.6     14.8     12.2"
+    b"      7.1     11.7      5.3      4.3    53459\r\n"
+)
+
+
+def separar_original(rafaga: bytes, fragmento: int) -> int:
+    buffer, lineas = b"", 0
+    for i in range(0, len(rafaga), fragmento):
+        buffer += rafaga[i : i + fragmento]
+    while b"\r\n" in buffer:
+        raw, buffer = buffer.split(b"\r\n", 1)
+        lineas += 1
+    return lineas
+
+
+def separar_framer(rafaga: bytes, fragmento: int) -> int:
+    separador, lineas = LineFramer(b"\r\n"), 0
+    for i in range(0, len(rafaga), fragmento):
+        separador.feed(rafaga[i : i + fragmento])
+        for _ in separador.lines():
+            lineas += 1
+    return lineas
+
+
+def medir(funcion, rafaga: bytes, fragmento: int):
+    inicio = time.perf_counter()
+    lineas = funcion(rafaga, fragmento)
+    return lineas, time.perf_counter() - inicio
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark de recepción del Grimm")
+    p.add_argument("--megas", type=float, nargs="+", default=[1, 4, 16])
+    p.add_argument("--fragmento", type=int, default=4096)
+    p.add_argument(
+        "--limite-original",
+        type=float,
+        default=4,
+        help="MB a partir de los cuales no se mide la versión cuadrática",
+    )
+    args = p.parse_args()
+
+    print(f"{'MB':>6s} {'lineas':>8s} {'antes (s)':>10s} {'despues (s)':>12s}")
+    for megas in args.megas:
+        rafaga = LINEA * int(megas * 1024 * 1024 / len(LINEA))
+        lineas, despues = medir(separar_framer, rafaga, args.fragmento)
+        if megas <= args.limite_original:
+            _, antes = medir(separar_original, rafaga, args.fragmento)
+            antes = f"{antes:10.3f}"
+        else:
+            antes = f"{'-':>10s}"
+        print(f"{megas:6.1f} {lineas:8d} {antes} {despues:12.3f}")
+
+
+if __name__ == "__main__":
+    main()
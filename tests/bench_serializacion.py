@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Microbenchmark de serialización de filas CSV de los analizadores.
+
+Compara la serialización original, que llamaba a datetime.now() y armaba la
+fila concatenando cadenas columna por columna, contra la plantilla que cada
+clase compila una sola vez, para los cinco tipos de analizador.
+
+Uso:
+    python tests/bench_serializacion.py
+    python tests/bench_serializacion.py --filas 200000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from analyzers import O341M, AF22M, EcoPhysicsNOx, GrimmEDM264, WeatherUnderground
+
+MUESTRAS = {
+    O341M: {"O3": "17.7 PPB", "EXT1": "1.0 mv", "EXT2": "0.0 mv"},
+    AF22M: {"SO2": "3.510 PPB"},
+    EcoPhysicsNOx: {"NO2": "0.012", "NO": "0.004", "NOx": "0.017"},
+    GrimmEDM264: {
+        "TSP": 17.2,
+        "PM10": 9.2,
+        "PM4": 5.6,
+        "PM25": 4.7,
+        "PM1": 4.0,
+        "PMcoarse": 4.6,
+        "TC": 53459.0,
+        "GrimmTemp": 17.7,
+        "GrimmRH": 83.5,
+    },
+    WeatherUnderground: {
+        "MeteoTempOut": 24.1,
+        "MeteoRHOut": 61.0,
+        "MeteoDewPoint": 16.2,
+        "MeteoPressure": 967.8,
+        "MeteoWindSpeed": 2.3,
+        "MeteoWindGust": 4.1,
+        "MeteoWindDir": 120.0,
+        "MeteoRainHour": 0.0,
+        "MeteoRainDay": 1.3,
+        "MeteoSolarRad": 612.0,
+        "MeteoUV": 6.0,
+        "MeteoTempIn": 21.4,
+        "MeteoRHIn": 45.0,
+    },
+}
+
+
+def serializar_original(columns, values) -> str:
+    result = datetime.strftime(datetime.now(), '"%Y-%m-%d","%H:%M:%S"')
+    for column in columns:
+        result = result + f',"{values.get(column, "NA")}"'
+    return result
+
+
+def medir(funcion, filas: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(filas):
+        funcion()
+    return filas / (time.perf_counter() - inicio)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark de serialización de filas")
+    p.add_argument("--filas", type=int, default=100000)
+    args = p.parse_args()
+
+    print(f"{'Analizador':20s} {'antes (filas/s)':>16s} {'despues (filas/s)':>18s}")
+    for clase, values in MUESTRAS.items():
+        analizador = clase.__new__(clase)
+        fecha = datetime.now()
+        antes = medir(lambda: serializar_original(clase.COLUMNS, values), args.filas)
+        despues = medir(lambda: analizador._serialize_values(values, fecha), args.filas)
+        print(f"{clase.__name__:20s} {antes:16.0f} {despues:18.0f}")
+
+
+if __name__ == "__main__":
+    main()
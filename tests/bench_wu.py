@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Prueba de carga del servidor HTTP de WeatherUnderground.
+
+Levanta el servidor en un proceso hijo y lo carga con 1, 10 y 100 clientes
+simultáneos que envían updates en conexiones keep-alive, como haría una
+estación EasyWeather. Reporta peticiones por segundo, la memoria residente
+y la cantidad de hilos del proceso servidor, para el servidor asíncrono
+actual y para el ThreadingHTTPServer anterior (un hilo por conexión).
+
+Uso:
+    python tests/bench_wu.py
+    python tests/bench_wu.py --clientes 1 10 100 --segundos 5
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from analyzers import WeatherUnderground
+from webserver import HttpServer
+
+UPDATE = (
+    "/weatherstation/updateweatherstation.php?ID=KEALAB&PASSWORD=clave"
+    "&tempf=75.2&humidity=61&dewptf=61.2&windchillf=75.2&absbaromin=28.58"
+    "&windspeedmph=5.1&windgustmph=9.2&winddir=120&rainin=0&dailyrainin=0.05"
+    "&solarradiation=612.3&UV=6&indoortempf=70.5&indoorhumidity=45"
+    "&dateutc=now&action=updateraw"
+)
+
+
+def servidor(modo: str, conexion):
+    meteo = WeatherUnderground(
+        "Meteo",
+        port=0,
+        publisher=None,
+        topic="",
+        station_id="KEALAB",
+        password="clave",
+        simulated=True,
+    )
+    if modo == "asyncio":
+        http_server = HttpServer(
+            "127.0.0.1", 0, meteo._handle_get, name="WU", max_connections=16
+        )
+        http_server.start()
+        conexion.send(http_server.port)
+    else:
+
+        class Handler(BaseHTTPRequestHandler):
+            timeout = 15
+
+            def do_GET(handler):
+                meteo._handle_get(handler)
+
+            def log_message(handler, fmt, *args):
+                return
+
+        http_server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        http_server.daemon_threads = True
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+        conexion.send(http_server.server_address[1])
+
+    while True:
+        time.sleep(1)
+        meteo._get_values()
+
+
+def estado(pid: int) -> tuple:
+    campos = {}
+    with open(f"/proc/{pid}/status") as archivo:
+        for linea in archivo:
+            clave, _, valor = linea.partition(":")
+            campos[clave] = valor.split()[0] if valor.split() else ""
+    return int(campos["VmRSS"]), int(campos["Threads"])
+
+
+def cliente(port: int, fin: float, cuenta: list, errores: list):
+    conexion = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while time.monotonic() < fin:
+        try:
+            conexion.request("GET", UPDATE)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            if respuesta.status == 200:
+                cuenta.append(1)
+            else:
+                errores.append(respuesta.status)
+        except (OSError, http.client.HTTPException):
+            errores.append(0)
+            conexion.close()
+    conexion.close()
+
+
+def medir(modo: str, clientes: int, segundos: float):
+    padre, hijo = multiprocessing.Pipe()
+    proceso = multiprocessing.Process(target=servidor, args=(modo, hijo), daemon=True)
+    proceso.start()
+    port = padre.recv()
+    rss_inicial, _ = estado(proceso.pid)
+
+    cuenta, errores = [], []
+    fin = time.monotonic() + segundos
+    hilos = [
+        threading.Thread(target=cliente, args=(port, fin, cuenta, errores))
+        for _ in range(clientes)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    rss_max, hilos_max = rss_inicial, 0
+    while any(hilo.is_alive() for hilo in hilos):
+        rss, cantidad = estado(proceso.pid)
+        rss_max, hilos_max = max(rss_max, rss), max(hilos_max, cantidad)
+        time.sleep(0.05)
+    proceso.terminate()
+    proceso.join()
+    return len(cuenta) / segundos, len(errores), rss_inicial, rss_max, hilos_max
+
+
+def main():
+    p = argparse.ArgumentParser(description="Prueba de carga del servidor WU")
+    p.add_argument("--clientes", type=int, nargs="+", default=[1, 10, 100])
+    p.add_argument("--segundos", type=float, default=5)
+    args = p.parse_args()
+
+    print(
+        f"{'servidor':10s} {'clientes':>8s} {'req/s':>8s} {'errores':>8s} "
+        f"{'RSS inicial':>12s} {'RSS max':>10s} {'hilos max':>10s}"
+    )
+    for modo in ("hilos", "asyncio"):
+        for clientes in args.clientes:
+            tasa, errores, inicial, maximo, hilos = medir(modo, clientes, args.segundos)
+            print(
+                f"{modo:10s} {clientes:8d} {tasa:8.0f} {errores:8d} "
+                f"{inicial:9d} kB {maximo:7d} kB {hilos:10d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import pytest
+
+from datetime import datetime
+from aggregation import Aggregator
+
+
+def test_acumular_estadisticos_por_canal():
+    agregador = Aggregator(("O3", "EXT1"), periods=(60,))
+    for segundo, valor in ((0, "10.0 PPB"), (20, "20.0 PPB"), (40, "30.0 PPB")):
+        assert agregador.add({"O3": valor}, datetime(2023, 12, 24, 8, 3, segundo)) == []
+
+    cerradas = agregador.add({"O3": "5.0 PPB"}, datetime(2023, 12, 24, 8, 4, 0))
+    assert len(cerradas) == 1
+    periodo, inicio, stats = cerradas[0]
+    assert periodo == 60
+    assert inicio == datetime(2023, 12, 24, 8, 3, 0)
+    assert stats["O3"].count == 3
+    assert stats["O3"].mean == pytest.approx(20.0)
+    assert stats["O3"].min == 10.0
+    assert stats["O3"].max == 30.0
+    assert stats["O3"].std == pytest.approx(10.0)
+    assert "EXT1" not in stats
+
+    assert agregador.serialize(stats, inicio) == (
+        '"2023-12-24","08:03:00","20","10","30","10","3","NA","NA","NA","NA","0"'
+    )
+
+
+def test_cerrar_ventanas_de_distintos_periodos():
+    agregador = Aggregator(("SO2",), periods=(60, 600))
+    agregador.add({"SO2": 1.0}, datetime(2023, 12, 24, 8, 9, 30))
+    agregador.add({"SO2": "NA"}, datetime(2023, 12, 24, 8, 9, 45))
+
+    cerradas = agregador.add({}, datetime(2023, 12, 24, 8, 10, 5))
+    assert [(periodo, inicio) for periodo, inicio, _ in cerradas] == [
+        (60, datetime(2023, 12, 24, 8, 9, 0)),
+        (600, datetime(2023, 12, 24, 8, 0, 0)),
+    ]
+    assert all(stats["SO2"].count == 1 for _, _, stats in cerradas)
+    assert agregador.means(cerradas[0][2]) == {"SO2": 1.0}
+
+    assert agregador.add({}, datetime(2023, 12, 24, 8, 12, 0)) == []
+
+
+def test_acumular_una_tanda_con_muestras_atrasadas():
+    agregador = Aggregator(("SO2",), periods=(60,))
+    cerradas = agregador.add_many(
+        [
+            ({"SO2": 1.0}, datetime(2023, 12, 24, 8, 3, 10)),
+            ({"SO2": 2.0}, datetime(2023, 12, 24, 8, 4, 10)),
+            ({"SO2": 4.0}, datetime(2023, 12, 24, 8, 3, 50)),
+        ]
+    )
+    assert [(periodo, inicio) for periodo, inicio, _ in cerradas] == [
+        (60, datetime(2023, 12, 24, 8, 3, 0))
+    ]
+    assert cerradas[0][2]["SO2"].count == 1
+
+    cerradas = agregador.tick(datetime(2023, 12, 24, 8, 5, 0))
+    assert cerradas[0][1] == datetime(2023, 12, 24, 8, 4, 0)
+    assert cerradas[0][2]["SO2"].mean == pytest.approx(3.0)
+
+
+def test_rechazar_periodos_que_no_dividen_un_dia():
+    with pytest.raises(ValueError):
+        Aggregator(["O3"], periods=(60, 7 * 60))
+    assert Aggregator.valid_period(900)
+    assert not Aggregator.valid_period(0)
+    assert not Aggregator.valid_period(25 * 3600)
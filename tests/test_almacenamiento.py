@@ -27,15 +27,30 @@
 # SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
 ##################################################################################################
 
+import io
 import os
+import math
 import glob
+import gzip
 import shutil
+import threading
+import time
 import pytest
 import paho.mqtt.client as mqtt
 import serial
 
 from datetime import datetime
 from dataloggers import Datalogger
+from storage import (
+    read_binary,
+    export_csv,
+    rebuild_index,
+    Compressor,
+    CsvWriter,
+    BinaryWriter,
+    read_range,
+)
+from aggregation import Aggregator
 from pytest_mock import MockerFixture
 from unittest.mock import MagicMock, call
 from pathlib import Path
@@ -50,10 +65,16 @@ CONFIG_FILE = Path(__file__).parent / "data" / "config.yaml"
 
 @pytest.fixture(autouse=True)
 def mock_plataform(mocker):
+    mocker.client_instance = MagicMock()
+    mocker.create_client = mocker.patch.object(
+        mqtt, "Client", return_value=mocker.client_instance
+    )
+
     mocker.serial_port = MagicMock()
     mocker.init_serial = mocker.patch.object(
         serial, "Serial", return_value=mocker.serial_port
     )
+    mocker.serial_port.in_waiting = 0
     mocker.now = MagicMock()
     mocker.datetime = mocker.patch("analyzers.datetime", wraps=datetime)
 
@@ -283,3 +304,410 @@ def test_remover_datos_demasiado_frecuentes_ozono(mocker: MockerFixture):
     assert len(lineas) == 3
     assert lineas[1] == '"2023-12-24","08:03:01","17.8 PPB","1.5 mv","0.0 mv"'
     assert lineas[2] == '"2023-12-24","08:04:05","15.6 PPB","1.2 mv","0.7 mv"'
+
+
+def test_agrupar_escrituras_en_el_archivo_almacenamiento(mocker: MockerFixture):
+    registro = "Ozono.csv"
+    if os.path.isfile(registro):
+        os.remove(registro)
+
+    datalogger = Datalogger(config=CONFIG_FILE)
+    datalogger.start()
+    datalogger._analyzers[1].filter_data = 0
+    datalogger._analyzers[1].flush_rows = 3
+    datalogger._analyzers[1].flush_interval = 3600
+
+    mocker.serial_port.read_until.side_effect = [
+        b"14-00-01 23:04  M000  O3   17.8  PPB   EXT1   1.5   mv   EXT2   0.0   mv   \x0D\x0A",
+    ]
+    mocker.datetime.now.return_value = datetime(2023, 12, 24, 8, 3, 1)
+    datalogger._analyzers[1].poll()
+
+    mocker.serial_port.read_until.side_effect = [
+        b"14-00-01 23:04  M000  O3   19.8  PPB   EXT1   0.5   mv   EXT2   1.0   mv   \x0D\x0A",
+    ]
+    mocker.datetime.now.return_value = datetime(2023, 12, 24, 8, 3, 10)
+    datalogger._analyzers[1].poll()
+
+    with open(registro, "r") as archivo:
+        lineas = archivo.read().splitlines()
+    assert len(lineas) <= 1
+
+    datalogger.close()
+
+    with open(registro, "r") as archivo:
+        lineas = archivo.read().splitlines()
+    assert len(lineas) == 3
+    assert lineas[1] == '"2023-12-24","08:03:01","17.8 PPB","1.5 mv","0.0 mv"'
+    assert lineas[2] == '"2023-12-24","08:03:10","19.8 PPB","0.5 mv","1.0 mv"'
+
+
+def test_publicar_archivo_almacenamiento_incrementalmente(mocker: MockerFixture):
+    registro = "Ozono.csv"
+    if os.path.isfile(registro):
+        os.remove(registro)
+
+    if os.path.exists("./ftp"):
+        shutil.rmtree("./ftp")
+
+    datalogger = Datalogger(config=CONFIG_FILE)
+    datalogger.start()
+
+    for dia, valor in ((28, "17.8"), (29, "19.8"), (30, "15.6")):
+        mocker.serial_port.read_until.side_effect = [
+            f"14-00-01 23:04  M000  O3   {valor}  PPB   EXT1   1.5   mv   EXT2   0.0   mv   \r\n".encode(),
+        ]
+        mocker.datetime.now.return_value = datetime(2023, 11, dia, 7, 3, 1)
+        datalogger._analyzers[1].poll()
+
+    with open("./ftp/Ozono-2023-11.csv", "r") as archivo:
+        lineas = archivo.read().splitlines()
+
+    assert len(lineas) == 3
+    assert lineas[0] == '"Fecha","Hora","O3","EXT1","EXT2"'
+    assert lineas[1] == '"2023-11-28","07:03:01","17.8 PPB","1.5 mv","0.0 mv"'
+    assert lineas[2] == '"2023-11-29","07:03:01","19.8 PPB","1.5 mv","0.0 mv"'
+
+    with open(".Ozono.publish", "r") as archivo:
+        ruta, offset = archivo.read().splitlines()
+    assert ruta == "./ftp/Ozono-2023-11.csv"
+    assert int(offset) == os.path.getsize("./ftp/Ozono-2023-11.csv")
+
+
+def test_almacenar_datos_en_formato_binario(mocker: MockerFixture):
+    if os.path.exists("./ftp"):
+        shutil.rmtree("./ftp")
+
+    datalogger = Datalogger(config=CONFIG_FILE)
+    datalogger.start()
+    datalogger._analyzers[1].filter_data = 0
+    datalogger._analyzers[1].storage_format = "binary"
+
+    for minuto, valor, ext2 in (
+        (3, "17.8", "0.0"),
+        (4, "19.8", "NA"),
+        (5, "15.6", "0.7"),
+    ):
+        mocker.serial_port.read_until.side_effect = [
+            f"14-00-01 23:04  M000  O3   {valor}  PPB   EXT1   1.5   mv   EXT2   {ext2}   mv   \r\n".encode(),
+        ]
+        mocker.datetime.now.return_value = datetime(2023, 12, 24, 8, minuto, 0)
+        datalogger._analyzers[1].poll()
+    datalogger.close()
+
+    assert not os.path.isfile("./ftp/Ozono-2023-12.csv")
+    datos = read_binary(
+        "./ftp", "Ozono", datetime(2023, 12, 24, 8, 4), datetime(2023, 12, 24, 8, 6)
+    )
+    assert list(datos["ts"]) == [
+        datetime(2023, 12, 24, 8, 4).timestamp(),
+        datetime(2023, 12, 24, 8, 5).timestamp(),
+    ]
+    assert list(datos["O3"]) == [19.8, 15.6]
+    assert math.isnan(datos["EXT2"][0])
+
+    destino = io.StringIO()
+    export_csv("./ftp", "Ozono", datetime(2023, 12, 1), datetime(2024, 1, 1), destino)
+    lineas = destino.getvalue().splitlines()
+    assert len(lineas) == 4
+    assert lineas[0] == '"Fecha","Hora","O3","EXT1","EXT2"'
+    assert lineas[2] == '"2023-12-24","08:04:00","19.8","1.5","NA"'
+
+
+def test_consultar_rango_con_indice(mocker: MockerFixture):
+    for archivo in ("Ozono.csv", "Ozono.idx", ".Ozono.publish"):
+        if os.path.isfile(archivo):
+            os.remove(archivo)
+
+    if os.path.exists("./ftp"):
+        shutil.rmtree("./ftp")
+
+    datalogger = Datalogger(config=CONFIG_FILE)
+    datalogger.start()
+    datalogger._analyzers[1].filter_data = 0
+
+    fechas = [
+        datetime(2023, 11, 30, 23, 45, 0),
+        datetime(2023, 11, 30, 23, 55, 0),
+        datetime(2023, 12, 1, 0, 5, 0),
+        datetime(2023, 12, 1, 0, 15, 0),
+        datetime(2023, 12, 1, 0, 25, 0),
+    ]
+    for indice, fecha in enumerate(fechas):
+        mocker.serial_port.read_until.side_effect = [
+            f"14-00-01 23:04  M000  O3   1{indice}.0  PPB   EXT1   1.5   mv   EXT2   0.0   mv   \r\n".encode(),
+        ]
+        mocker.datetime.now.return_value = fecha
+        datalogger._analyzers[1].poll()
+
+    assert os.path.isfile("./ftp/Ozono-2023-11.idx")
+    with open("Ozono.idx", "r") as archivo:
+        indice = archivo.read().splitlines()
+    assert indice[0] == "2023-12-01 00:00:00 35"
+
+    filas = list(
+        datalogger._analyzers[1].read_range(
+            datetime(2023, 11, 30, 23, 50), datetime(2023, 12, 1, 0, 20)
+        )
+    )
+    assert [fila[2] for fila in filas] == ["11.0 PPB", "12.0 PPB", "13.0 PPB"]
+    assert filas[0][:2] == ["2023-11-30", "23:55:00"]
+
+    with open("Ozono.idx", "r") as archivo:
+        esperado = archivo.read()
+    os.remove("Ozono.idx")
+    assert rebuild_index("Ozono.csv") == "Ozono.idx"
+    with open("Ozono.idx", "r") as archivo:
+        assert archivo.read() == esperado
+
+
+def test_comprimir_archivos_rotados(mocker: MockerFixture):
+    for archivo in ("Ozono.csv", "Ozono.idx", ".Ozono.publish"):
+        if os.path.isfile(archivo):
+            os.remove(archivo)
+
+    if os.path.exists("./ftp"):
+        shutil.rmtree("./ftp")
+
+    datalogger = Datalogger(config=CONFIG_FILE)
+    datalogger.start()
+    compressor = Compressor()
+    compressor.start()
+    datalogger._analyzers[1].compressor = compressor
+
+    for fecha, valor in (
+        (datetime(2023, 11, 29, 7, 3, 1), "17.8"),
+        (datetime(2023, 11, 30, 8, 4, 2), "19.8"),
+        (datetime(2023, 12, 1, 9, 5, 3), "15.6"),
+    ):
+        mocker.serial_port.read_until.side_effect = [
+            f"14-00-01 23:04  M000  O3   {valor}  PPB   EXT1   1.5   mv   EXT2   0.0   mv   \r\n".encode(),
+        ]
+        mocker.datetime.now.return_value = fecha
+        datalogger._analyzers[1].poll()
+    compressor.stop()
+
+    assert not os.path.isfile("./ftp/Ozono-2023-11.csv")
+    assert os.path.isfile("./ftp/Ozono-2023-11.csv.gz")
+
+    filas = list(
+        datalogger._analyzers[1].read_range(
+            datetime(2023, 11, 30), datetime(2023, 12, 2)
+        )
+    )
+    assert [fila[2] for fila in filas] == ["19.8 PPB", "15.6 PPB"]
+
+
+def test_almacenar_promedios_de_todas_las_muestras(mocker: MockerFixture):
+    for archivo in ("Ozono.csv", "Ozono.idx", "Ozono-60s.csv", "Ozono-60s.idx"):
+        if os.path.isfile(archivo):
+            os.remove(archivo)
+
+    datalogger = Datalogger(config=CONFIG_FILE)
+    datalogger.start()
+    analizador = datalogger._analyzers[1]
+    analizador.aggregator = Aggregator(analizador.COLUMNS, periods=(60,))
+
+    for segundo, valor in ((5, "17.0"), (15, "19.0"), (25, "21.0"), (5, "15.0")):
+        minuto = 3 if valor != "15.0" else 4
+        mocker.serial_port.read_until.side_effect = [
+            f"14-00-01 23:04  M000  O3   {valor}  PPB   EXT1   1.5   mv   EXT2   0.0   mv   \r\n".encode(),
+        ]
+        mocker.datetime.now.return_value = datetime(2023, 12, 24, 8, minuto, segundo)
+        analizador.poll()
+
+    with open("Ozono.csv", "r") as archivo:
+        assert len(archivo.read().splitlines()) == 3
+
+    with open("Ozono-60s.csv", "r") as archivo:
+        lineas = archivo.read().splitlines()
+    assert len(lineas) == 2
+    assert lineas[1].startswith('"2023-12-24","08:03:00","19","17","21","2","3"')
+    assert datalogger._values["O3"] == 19.0
+
+
+def test_descargar_desde_otro_hilo_sin_perder_filas(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    writer = CsvWriter(
+        "Prueba",
+        '"Fecha","Hora","X"',
+        lambda values, fecha: f"{fecha:%H:%M:%S},{values['X']}",
+        dir=str(tmp_path / "ftp"),
+        flush_rows=1000,
+        flush_interval=3600,
+        index_interval=0,
+    )
+    terminar = threading.Event()
+
+    def mantenimiento():
+        while not terminar.is_set():
+            writer.flush()
+
+    hilo = threading.Thread(target=mantenimiento)
+    hilo.start()
+    for indice in range(20000):
+        writer.write({"X": indice}, datetime(2023, 12, 24, 8, 0, indice % 60))
+    terminar.set()
+    hilo.join()
+    writer.close()
+
+    with open("Prueba.csv") as archivo:
+        filas = archivo.read().splitlines()[1:]
+    assert [int(fila.split(",")[1]) for fila in filas] == list(range(20000))
+
+
+def test_descargar_al_vencer_el_intervalo_sin_filas_nuevas(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    writer = CsvWriter(
+        "Prueba",
+        '"Fecha","Hora","X"',
+        lambda values, fecha: f"{fecha:%H:%M:%S},{values['X']}",
+        dir=str(tmp_path / "ftp"),
+        flush_rows=1000,
+        flush_interval=0.05,
+        index_interval=0,
+    )
+    writer.write({"X": 1}, datetime(2023, 12, 24, 8, 0))
+    writer.flush_due()
+    assert (tmp_path / "Prueba.csv").read_text().splitlines()[1:] == []
+
+    time.sleep(0.06)
+    writer.flush_due()
+    assert (tmp_path / "Prueba.csv").read_text().splitlines()[1:] == ["08:00:00,1"]
+    writer.close()
+
+
+def test_no_encolar_dos_veces_el_mismo_archivo(tmp_path):
+    for mes in (10, 11):
+        (tmp_path / f"Ozono-2023-{mes}.csv").write_text("")
+    compressor = Compressor()
+    compressor.scan(str(tmp_path), datetime(2023, 12, 1))
+    compressor.scan(str(tmp_path), datetime(2023, 12, 1))
+    assert compressor._queue.qsize() == 2
+
+    compressor.start()
+    compressor.stop()
+    assert sorted(os.listdir(tmp_path)) == [
+        "Ozono-2023-10.csv.gz",
+        "Ozono-2023-11.csv.gz",
+    ]
+
+
+def test_no_comprimir_el_mes_que_todavia_no_se_roto(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    compressor = Compressor()
+    writer = CsvWriter(
+        "Prueba",
+        '"Fecha","Hora","X"',
+        lambda values, fecha: f'"{fecha:%Y-%m-%d}","{fecha:%H:%M:%S}","{values["X"]}"',
+        dir=str(tmp_path / "ftp"),
+        compressor=compressor,
+    )
+    writer.write({"X": 1}, datetime(2023, 11, 29, 8))
+    writer.write({"X": 2}, datetime(2023, 11, 30, 8))
+    assert os.path.isfile(tmp_path / "ftp" / "Prueba-2023-11.csv")
+
+    compressor.scan(str(tmp_path / "ftp"), datetime(2023, 12, 1))
+    assert compressor._queue.qsize() == 0
+
+    writer.write({"X": 3}, datetime(2023, 11, 30, 9))
+    writer.write({"X": 4}, datetime(2023, 12, 1, 8))
+    writer.close()
+    compressor.start()
+    compressor.stop()
+
+    with gzip.open(tmp_path / "ftp" / "Prueba-2023-11.csv.gz", "rt") as archivo:
+        filas = archivo.read().splitlines()[1:]
+    assert [fila.split(",")[2] for fila in filas] == ['"1"', '"2"', '"3"']
+    assert not os.path.exists(tmp_path / "ftp" / "Prueba-2023-11.csv")
+
+
+def test_comprimir_de_nuevo_un_archivo_reemplazado(tmp_path):
+    archivo = tmp_path / "Ozono-2023-11.csv"
+    archivo.write_text("prefijo\n")
+    compressor = Compressor()
+    compressor.submit(str(archivo))
+    compressor.compress(compressor._queue.get())
+
+    archivo.write_text("prefijo\ncompleto\n")
+    compressor.submit(str(archivo))
+    assert compressor._queue.qsize() == 1
+
+    compressor.start()
+    compressor.stop()
+    with gzip.open(f"{archivo}.gz", "rt") as comprimido:
+        assert comprimido.read() == "prefijo\ncompleto\n"
+    assert sorted(os.listdir(tmp_path)) == ["Ozono-2023-11.csv.gz"]
+
+
+def test_descartar_registro_binario_incompleto(tmp_path):
+    writer = BinaryWriter("Prueba", ["X", "Y"], dir=str(tmp_path))
+    writer.write({"X": 1.0, "Y": 2.0}, datetime(2023, 12, 24, 8, 0))
+    writer.close()
+    with open(tmp_path / "Prueba-2023-12.bin", "ab") as archivo:
+        archivo.write(b"\x00" * 13)
+
+    writer = BinaryWriter("Prueba", ["X", "Y"], dir=str(tmp_path))
+    writer.write({"X": 3.0, "Y": 4.0}, datetime(2023, 12, 24, 8, 1))
+    writer.close()
+
+    datos = read_binary(
+        str(tmp_path), "Prueba", datetime(2023, 12, 24), datetime(2023, 12, 25)
+    )
+    assert list(datos["X"]) == [1.0, 3.0]
+    assert list(datos["Y"]) == [2.0, 4.0]
+
+
+def test_apartar_la_particion_binaria_con_otras_columnas(tmp_path):
+    writer = BinaryWriter("Prueba", ["X"], dir=str(tmp_path))
+    writer.write({"X": 1.0}, datetime(2023, 12, 24, 8, 0))
+    writer.close()
+
+    writer = BinaryWriter("Prueba", ["X", "Y"], dir=str(tmp_path))
+    writer.write({"X": 3.0, "Y": 4.0}, datetime(2023, 12, 24, 8, 1))
+    writer.close()
+
+    assert sorted(os.listdir(tmp_path)) == ["Prueba-2023-12.bin", "Prueba-2023-12.bin.1"]
+    datos = read_binary(
+        str(tmp_path), "Prueba", datetime(2023, 12, 24), datetime(2023, 12, 25)
+    )
+    assert list(datos["X"]) == [3.0]
+    assert list(datos["Y"]) == [4.0]
+
+
+def test_saltar_al_intervalo_en_archivos_comprimidos(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    compressor = Compressor()
+    writer = CsvWriter(
+        "Prueba",
+        '"Fecha","Hora","X"',
+        lambda values, fecha: f'"{fecha:%Y-%m-%d}","{fecha:%H:%M:%S}","{values["X"]}"',
+        dir=str(tmp_path / "ftp"),
+        flush_rows=100,
+        index_interval=600,
+        compressor=compressor,
+    )
+    for minuto in range(24 * 60):
+        writer.write({"X": minuto}, datetime(2023, 11, 30, minuto // 60, minuto % 60))
+    writer.write({"X": 0}, datetime(2023, 12, 1))
+    writer.close()
+    compressor.start()
+    compressor.stop()
+
+    comprimido = tmp_path / "ftp" / "Prueba-2023-11.csv.gz"
+    with open(f"{comprimido}.idx") as archivo:
+        miembros = archivo.read().splitlines()
+    assert len(miembros) == 144
+    assert miembros[-1].startswith("2023-11-30 23:50:00 ")
+
+    filas = list(
+        read_range(
+            str(tmp_path / "ftp"),
+            "Prueba",
+            datetime(2023, 11, 30, 23, 55),
+            datetime(2023, 11, 30, 23, 57),
+        )
+    )
+    assert [fila[2] for fila in filas] == ["1435", "1436"]
+    with gzip.open(comprimido, "rb") as archivo:
+        assert len(archivo.read().splitlines()) == 24 * 60 + 1
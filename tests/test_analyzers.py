@@ -27,10 +27,22 @@
 # SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
 ##################################################################################################
 
+import time
 import pytest
 import serial
+import socket
 
-from analyzers import Analyzer, AF22M, EcoPhysicsNOx
+from datetime import datetime, timedelta
+from analyzers import (
+    Analyzer,
+    AF22M,
+    O341M,
+    EcoPhysicsNOx,
+    GrimmEDM264,
+    WeatherUnderground,
+)
+from webserver import Request
+from readings import Reading
 from pytest_mock import MockerFixture
 from unittest.mock import MagicMock
 
@@ -47,11 +59,14 @@ def mock_port_port_init(mocker):
     mocker.init_serial = mocker.patch.object(
         serial, "Serial", return_value=mocker.serial_port
     )
+    mocker.serial_port.in_waiting = 0
 
 
 def test_crear_Analyzer(mocker: MockerFixture):
     analyzer = Analyzer("NO", port="/dev/tty.USB", publisher=None, topic="")
-    mocker.init_serial.assert_called_once_with(port="/dev/tty.USB", baudrate=9600)
+    mocker.init_serial.assert_called_once_with(
+        port="/dev/tty.USB", baudrate=9600, timeout=1, write_timeout=1
+    )
 
 
 def test_analizar_O3(mocker: MockerFixture):
@@ -59,19 +74,25 @@ def test_analizar_O3(mocker: MockerFixture):
         b"14-00-01 23:04  M000  O3   17.8  PPB   EXT1   1.5   mv   EXT2   0.0   mv   \x0D\x0A"
     ]
     esperado = {
-        "O3": "17.8 PPB",
-        "EXT1": "1.5 mv",
-        "EXT2": "0.0 mv",
+        "O3": Reading(17.8, "PPB", "M000"),
+        "EXT1": Reading(1.5, "mv", "M000"),
+        "EXT2": Reading(0.0, "mv", "M000"),
     }
-    analyzer = AF22M("O3", port="/dev/tty.USB", publisher=None, topic="")
-    mocker.init_serial.assert_called_once_with(port="/dev/tty.USB", baudrate=9600)
+    analyzer = O341M("O3", port="/dev/tty.USB", publisher=None, topic="")
+    mocker.init_serial.assert_called_once_with(
+        port="/dev/tty.USB", baudrate=9600, timeout=1, write_timeout=1
+    )
 
     resultado = analyzer.poll()
     assert esperado == resultado
 
 
 def test_analizar_NO2(mocker: MockerFixture):
-    esperado = {"NO2": "123456", "NO": "125689", "NOx": "123789"}
+    esperado = {
+        "NO2": Reading(123456.0),
+        "NO": Reading(125689.0),
+        "NOx": Reading(123789.0),
+    }
     mocker.serial_port.read_until.side_effect = [
         ACK + b"\x40" + STX + b"123456,125689,123789" + ETX
     ]
@@ -83,3 +104,174 @@ def test_analizar_NO2(mocker: MockerFixture):
     resultado = analyzer.poll()
     mocker.serial_port.write.assert_called_once_with(STX + b"01RD3" + ETX + b"\x25")
     assert resultado == esperado
+
+
+def test_serializar_valores_faltantes(mocker: MockerFixture):
+    analyzer = GrimmEDM264(
+        "PM", host="127.0.0.1", port=4711, publisher=None, topic="", simulated=True
+    )
+    fila = analyzer._serialize_values(
+        {"TSP": 17.2, "PM10": 9.2, "GrimmTemp": 17.7}, datetime(2023, 12, 24, 8, 3, 1)
+    )
+    assert fila == (
+        '"2023-12-24","08:03:01","17.2","9.2","NA","NA","NA","NA","NA","17.7","NA","NA"'
+    )
+
+
+class Rezago:
+    """Puerto serie con un rezago de tramas ya recibidas en el buffer."""
+
+    def __init__(self, datos: bytes):
+        self._datos = datos
+        self.port = "/dev/tty.USB"
+
+    @property
+    def in_waiting(self):
+        return len(self._datos)
+
+    def read_until(self):
+        fin = self._datos.find(b"\n") + 1
+        linea, self._datos = self._datos[:fin], self._datos[fin:]
+        return linea
+
+    def read(self, size=1):
+        chunk, self._datos = self._datos[:size], self._datos[size:]
+        return chunk
+
+
+def test_leer_solo_la_ultima_trama_del_rezago(mocker: MockerFixture):
+    trama = b"14-00-01 23:%02d  M000  O3   %4.1f  PPB   EXT1   1.0   mv   EXT2   0.0   mv\r\n"
+    rezago = b"".join(trama % (i % 60, i / 10) for i in range(2000))
+    mocker.init_serial.return_value = Rezago(rezago + b"\r\n14-00-01 23:2")
+    analyzer = AF22M("O3", port="/dev/tty.USB", publisher=None, topic="")
+
+    assert analyzer._read_serial_latest_line() == (
+        "14-00-01 23:19  M000  O3   199.9  PPB   EXT1   1.0   mv   EXT2   0.0   mv"
+    )
+    assert analyzer.backlog.dropped_lines == 2000
+    assert analyzer.backlog.dropped_bytes == len(rezago) + 15 - len(trama % (19, 199.9))
+    assert len(analyzer._tail) < 2 * len(trama % (0, 0))
+
+
+def test_ingerir_todas_las_tramas_del_rezago(
+    mocker: MockerFixture, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    ahora = datetime.now().replace(second=30, microsecond=0)
+    tramas = [
+        f"{ahora - timedelta(minutes=3 - i):%d-%m-%y %H:%M}  M000 SO2  {i}.5 PPB\r\n"
+        for i in range(3)
+    ]
+    tramas.append("14-00-01 23:06  M000 SO2  9.5 PPB\r\n")
+    mocker.init_serial.return_value = Rezago("".join(tramas).encode() + b"07-09")
+    publisher = MagicMock()
+    analyzer = AF22M(
+        "SO2", port="/dev/tty.USB", publisher=publisher, topic="", ingest="all"
+    )
+    analyzer.dir = str(tmp_path)
+
+    assert analyzer.poll() == {"SO2": Reading(9.5, "PPB", "M000")}
+    publisher.assert_called_once_with(
+        topic="", values={"SO2": Reading(9.5, "PPB", "M000")}
+    )
+    analyzer.close()
+
+    with open(tmp_path / "SO2.csv") as archivo:
+        filas = archivo.read().splitlines()[1:]
+    assert len(filas) == 4
+    for i, fila in enumerate(filas[:3]):
+        fecha = ahora.replace(second=0) - timedelta(minutes=3 - i)
+        assert fila.startswith(f'"{fecha:%Y-%m-%d}","{fecha:%H:%M}:00","{i}.5 PPB"')
+    assert filas[3].endswith('"9.5 PPB"')
+
+
+def test_fechar_cada_trama_del_mismo_minuto(
+    mocker: MockerFixture, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    minuto = datetime.now().replace(second=0, microsecond=0) - timedelta(minutes=2)
+    tramas = [f"{minuto:%d-%m-%y %H:%M}  M000 SO2  {i}.5 PPB\r\n" for i in range(6)]
+    mocker.init_serial.return_value = Rezago("".join(tramas).encode())
+    analyzer = AF22M("SO2", port="/dev/tty.USB", publisher=None, topic="", ingest="all")
+    analyzer.dir = str(tmp_path)
+    analyzer.filter_data = 5
+
+    analyzer.poll()
+    analyzer.close()
+
+    with open(tmp_path / "SO2.csv") as archivo:
+        filas = archivo.read().splitlines()[1:]
+    assert [fila.split(",")[1] for fila in filas] == [
+        f'"{minuto:%H:%M}:{segundo:02d}"' for segundo in range(0, 60, 10)
+    ]
+
+
+def test_conectar_el_grimm_en_segundo_plano(mocker: MockerFixture):
+    servidor = socket.socket()
+    servidor.bind(("127.0.0.1", 0))
+    servidor.listen()
+    servidor.settimeout(2)
+    host, port = servidor.getsockname()
+
+    analyzer = GrimmEDM264("PM", host=host, port=port, publisher=None, topic="")
+    try:
+        inicio = time.monotonic()
+        assert analyzer._get_values() == {}
+        assert time.monotonic() - inicio < 0.1
+
+        conexion, _ = servidor.accept()
+        assert conexion.recv(1) == b"\x05"
+        conexion.sendall(
+            b"N_     17.2      9.2      5.6      4.7      4.0      4.6     14.8"
+            b"     12.2      7.1     11.7      5.3      4.3    53459\r\n"
+        )
+        fin = time.monotonic() + 2
+        values = {}
+        while not values and time.monotonic() < fin:
+            time.sleep(0.01)
+            values = analyzer._get_values()
+        assert values["TSP"] == 17.2
+        assert values["TC"] == 53459.0
+        conexion.close()
+    finally:
+        analyzer.close()
+        servidor.close()
+
+
+def test_reducir_los_updates_de_la_estacion_meteorologica():
+    meteo = WeatherUnderground(
+        "Meteo", port=0, publisher=None, topic="", simulated=True
+    )
+    for tempf, gust, direccion, lluvia in (
+        (50, 2, 350, 0.01),
+        (68, 9, 10, 0.02),
+        (59, 4, 20, 0.03),
+    ):
+        peticion = Request(
+            "GET",
+            f"/update.php?tempf={tempf}&windgustmph={gust}&windspeedmph=2"
+            f"&winddir={direccion}&dailyrainin={lluvia}",
+            "HTTP/1.1",
+            {},
+            ("127.0.0.1", 1),
+        )
+        meteo._handle_get(peticion)
+
+    values = meteo._get_values()
+    assert values["MeteoTempOut"] == 15.0
+    assert values["MeteoWindGust"] == round(9 * 0.44704, 3)
+    assert values["MeteoWindDir"] == 6.705
+    assert values["MeteoRainDay"] == 0.762
+    assert meteo._get_values() == {}
+
+
+def test_convertir_las_lecturas_al_parsear():
+    analyzer = AF22M("SO2", port="/dev/tty.USB", publisher=None, topic="")
+    values = analyzer._parse_frame("07-09-23 16:41  M000 SO2  3.510E-1 PPB")
+    assert values["SO2"].value == 0.351
+    assert values["SO2"].unit == "PPB"
+    assert values["SO2"].status == "M000"
+
+    fila = analyzer._serialize_values(values, datetime(2023, 9, 7, 16, 41, 0))
+    assert fila == '"2023-09-07","16:41:00","3.510E-1 PPB"'
+    assert analyzer._parse_frame("07-09-23 16:41  M000 SO2  ---- PPB") == {}
@@ -27,14 +27,24 @@
 # SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
 ##################################################################################################
 
+import json
+import yaml
+import time
 import pytest
+import threading
 import paho.mqtt.client as mqtt
 import serial
 
-from dataloggers import Datalogger
+import logging
+
+from dataloggers import Datalogger, MqttHandler
+from spool import SegmentQueue
+from readings import Reading
+from ndata import NdataCodec
 from pytest_mock import MockerFixture
 from unittest.mock import MagicMock, call
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 STX = b"\x02"
 ETX = b"\x03"
@@ -55,6 +65,7 @@ def mock_plataform(mocker):
     mocker.init_serial = mocker.patch.object(
         serial, "Serial", return_value=mocker.serial_port
     )
+    mocker.serial_port.in_waiting = 0
 
 
 def test_crear_datalogger(mocker: MockerFixture):
@@ -62,20 +73,28 @@ def test_crear_datalogger(mocker: MockerFixture):
     datalogger.start()
 
     mocker.create_client.assert_called_once_with(
-        clean_session=True, client_id="laboratorio", protocol=4, transport="tcp"
+        client_id="datalogger", transport="tcp", protocol=4, clean_session=True
     )
     mocker.client_instance.connect.assert_called_once_with(
-        server="test.mosquitto.org", port=8883
+        host="test.mosquitto.org", port=1883
     )
 
     assert mocker.init_serial.call_args_list[0] == call(
-        port="/dev/tty.USB1", baudrate=9600
+        port="/dev/tty.USB1", baudrate=9600, timeout=1, write_timeout=1
     )
     assert mocker.init_serial.call_args_list[1] == call(
-        port="/dev/tty.USB2", baudrate=9600
+        port="/dev/tty.USB2", baudrate=9600, timeout=1, write_timeout=1
     )
 
 
+def ultimo_ndata(mocker: MockerFixture) -> dict:
+    argumentos = mocker.client_instance.publish.call_args_list[-1].kwargs
+    assert argumentos["topic"].startswith("V0/NDATA/")
+    payload = json.loads(argumentos["payload"])
+    del payload["meta"]
+    return payload
+
+
 def test_publicar_datos_recibidos_oxidonitroso(mocker: MockerFixture):
     datalogger = Datalogger(config=CONFIG_FILE)
     datalogger.start()
@@ -86,18 +105,9 @@ def test_publicar_datos_recibidos_oxidonitroso(mocker: MockerFixture):
     mocker.serial_port.read.side_effect = [b"\x47"]
 
     datalogger._analyzers[0].poll()
+    datalogger.publish_data()
 
-    assert mocker.client_instance.publish.call_count == 3
-
-    assert mocker.client_instance.publish.call_args_list[0] == call(
-        topic="lea/nox/NO2", payload="123456"
-    )
-    assert mocker.client_instance.publish.call_args_list[1] == call(
-        topic="lea/nox/NO", payload="125689"
-    )
-    assert mocker.client_instance.publish.call_args_list[2] == call(
-        topic="lea/nox/NOx", payload="123789"
-    )
+    assert ultimo_ndata(mocker) == {"NO2": 123456.0, "NO": 125689.0, "NOx": 123789.0}
 
 
 def test_publicar_datos_recibidos_ozono(mocker: MockerFixture):
@@ -109,15 +119,350 @@ def test_publicar_datos_recibidos_ozono(mocker: MockerFixture):
     ]
 
     datalogger._analyzers[1].poll()
+    datalogger.publish_data()
+
+    assert ultimo_ndata(mocker) == {"O3": 17.8, "EXT1": 1.5, "EXT2": 0.0}
+
+
+def test_almacenar_datos_sin_conexion_al_broker(mocker: MockerFixture, tmp_path):
+    datalogger = Datalogger(config=CONFIG_FILE)
+    datalogger.start()
+    datalogger._queue = SegmentQueue(str(tmp_path))
+    datalogger._queue_batch = 2
+    datalogger._queue_rate = 0
+    datalogger._queue_timeout = 60
+    datalogger._tokens = 2
+    datalogger._tokens_at = 0
 
-    assert mocker.client_instance.publish.call_count == 3
+    mocker.client_instance.is_connected.return_value = False
+    for indice in range(3):
+        datalogger._send("V0/NDATA/mac", f'{{"O3": {indice}}}')
+    mocker.client_instance.publish.reset_mock()
 
-    assert mocker.client_instance.publish.call_args_list[0] == call(
-        topic="lea/ozono/O3", payload="17.8 PPB"
+    mocker.client_instance.is_connected.return_value = True
+    datalogger._drain()
+    assert mocker.client_instance.publish.call_args_list == [
+        call(topic="V0/NDATA/mac", payload=b'{"O3": 0}', qos=1),
+        call(topic="V0/NDATA/mac", payload=b'{"O3": 1}', qos=1),
+    ]
+
+    mocker.client_instance.publish.reset_mock()
+    datalogger._tokens = 2
+    datalogger._drain()
+    assert mocker.client_instance.publish.call_args_list == [
+        call(topic="V0/NDATA/mac", payload=b'{"O3": 2}', qos=1),
+    ]
+
+
+def test_consultar_analizadores_en_paralelo(mocker: MockerFixture):
+    datalogger = Datalogger(config=CONFIG_FILE)
+    datalogger.start()
+    datalogger._update_cycles = 0
+
+    liberar = threading.Event()
+    lento = MagicMock()
+    lento.name = "Lento"
+    lento.poll.side_effect = lambda: liberar.wait(5)
+    rapido = MagicMock()
+    rapido.name = "Rapido"
+    rapido.poll.side_effect = lambda: datalogger.publisher(
+        topic="", values={"O3": Reading(17.8, "PPB")}
     )
-    assert mocker.client_instance.publish.call_args_list[1] == call(
-        topic="lea/ozono/EXT1", payload="1.5 mv"
+
+    lento.poll_interval = 0
+    rapido.poll_interval = 0
+    datalogger._analyzers = [lento, rapido]
+    datalogger.schedule_analyzers()
+    datalogger._pool = ThreadPoolExecutor(max_workers=2)
+    datalogger._deadline = 0.2
+
+    inicio = time.monotonic()
+    datalogger.poll()
+    assert time.monotonic() - inicio < 1
+    assert datalogger._values == {"O3": 17.8}
+
+    inicio = time.monotonic()
+    datalogger.poll()
+    assert time.monotonic() - inicio < 0.1
+    assert lento.poll.call_count == 1
+    assert rapido.poll.call_count == 2
+
+    liberar.set()
+    datalogger._pool.shutdown(wait=True)
+
+
+def test_consultar_analizadores_segun_su_intervalo(mocker: MockerFixture):
+    datalogger = Datalogger(config=CONFIG_FILE)
+    rapido, medio, lento = MagicMock(), MagicMock(), MagicMock()
+    rapido.poll_interval = 6
+    medio.poll_interval = 10
+    lento.poll_interval = 60
+    datalogger._analyzers = [rapido, medio, lento]
+    datalogger.schedule_analyzers()
+
+    assert datalogger.poll_tick() == 2
+    base = 999960.0
+    assert datalogger._due_analyzers(base) == [rapido, medio, lento]
+    assert datalogger._due_analyzers(base + 2) == []
+    assert datalogger._due_analyzers(base + 5.95) == [rapido]
+    assert datalogger._due_analyzers(base + 10) == [medio]
+    assert datalogger._due_analyzers(base + 12) == [rapido]
+    assert datalogger._due_analyzers(base + 60) == [rapido, medio, lento]
+
+
+def test_dejar_de_consultar_un_analizador_sin_datos(mocker: MockerFixture):
+    datalogger = Datalogger(config=CONFIG_FILE)
+    datalogger._health = {"threshold": 3, "backoff": 30, "max_backoff": 600}
+    muerto = MagicMock()
+    muerto.name = "Muerto"
+    muerto.poll.return_value = {}
+    muerto.poll_interval = 0
+    muerto.push = False
+    datalogger._analyzers = [muerto]
+    datalogger.schedule_analyzers()
+
+    for _ in range(10):
+        datalogger.poll_analyzers()
+
+    assert muerto.poll.call_count == 3
+    topic, payload = mocker.client_instance.publish.call_args.kwargs.values()
+    assert topic == f"V0/NSTATE/{datalogger._mac}"
+    assert json.loads(payload) == {
+        "ts": json.loads(payload)["ts"],
+        "lbl": "Muerto",
+        "state": "open",
+        "failures": 3,
+        "retry": 30,
+    }
+
+
+def test_seguir_consultando_los_equipos_que_transmiten_solos(mocker: MockerFixture):
+    datalogger = Datalogger(config=CONFIG_FILE)
+    assert datalogger._health is None
+
+    datalogger._health = {"threshold": 3, "backoff": 30, "max_backoff": 600}
+    estacion = MagicMock()
+    estacion.name = "Estacion"
+    estacion.poll.return_value = {}
+    estacion.poll_interval = 0
+    estacion.push = True
+    datalogger._analyzers = [estacion]
+    datalogger.schedule_analyzers()
+
+    for _ in range(10):
+        datalogger.poll_analyzers()
+
+    assert estacion.poll.call_count == 10
+    assert datalogger._breakers == {}
+
+
+def test_descargar_los_registros_en_cada_ciclo_de_poll(mocker: MockerFixture):
+    datalogger = Datalogger(config=CONFIG_FILE)
+    lento = MagicMock()
+    lento.poll_interval = 3600
+    datalogger._analyzers = [lento]
+    datalogger.schedule_analyzers()
+
+    for _ in range(3):
+        datalogger.poll_analyzers()
+
+    assert lento.poll.call_count == 1
+    assert lento.flush_due.call_count == 3
+
+
+def test_publicar_lecturas_sin_convertir_texto(mocker: MockerFixture):
+    datalogger = Datalogger(config=CONFIG_FILE)
+    datalogger.publisher(
+        topic="",
+        values={"SO2": Reading(3.5e-1, "PPB", "M000"), "TSP": 17.2, "X": "---"},
     )
-    assert mocker.client_instance.publish.call_args_list[2] == call(
-        topic="lea/ozono/EXT2", payload="0.0 mv"
+    assert datalogger._values == {"SO2": 0.35, "TSP": 17.2}
+
+
+def test_publicar_cada_lectura_en_el_topic_del_analizador(
+    mocker: MockerFixture, tmp_path
+):
+    with open(CONFIG_FILE) as archivo:
+        config = yaml.safe_load(archivo)
+    config["storage"]["dir"] = str(tmp_path / "ftp")
+    config["aggregation"] = {"periods": [60]}
+    config["anayzers"][1].update({"stream": True, "qos": 1, "retain": True})
+    config["anayzers"][2].update({"stream": True, "topic": "lea/ozono"})
+    archivo = tmp_path / "config.yaml"
+    archivo.write_text(yaml.safe_dump(config))
+
+    datalogger = Datalogger(config=str(archivo))
+    ozono, azufre = datalogger._analyzers[1:]
+    assert datalogger._streams == {ozono: (1, True), azufre: (0, False)}
+
+    mocker.serial_port.read_until.side_effect = [
+        b"14-00-01 23:04  M000  O3   17.8  PPB   EXT1   1.5   mv   EXT2   0.0   mv   \x0D\x0A"
+    ]
+    ozono.poll()
+    ozono.close()
+
+    assert mocker.client_instance.publish.call_count == 1
+    kwargs = mocker.client_instance.publish.call_args.kwargs
+    assert kwargs["topic"] == "lea/ozono"
+    assert kwargs["qos"] == 1
+    assert kwargs["retain"] is True
+    payload = json.loads(kwargs["payload"])
+    assert (payload["O3"], payload["EXT1"]) == (17.8, 1.5)
+
+
+def test_publicar_ndata_binario(mocker: MockerFixture, tmp_path):
+    with open(CONFIG_FILE) as archivo:
+        config = yaml.safe_load(archivo)
+    config["mqtt"]["encoding"] = "binary"
+    archivo = tmp_path / "config.yaml"
+    archivo.write_text(yaml.safe_dump(config))
+
+    datalogger = Datalogger(config=str(archivo))
+    datalogger.start()
+    nbirth = json.loads(mocker.client_instance.publish.call_args.kwargs["payload"])
+    codec = NdataCodec.from_schema(nbirth["schema"])
+    assert "O3" in nbirth["schema"]["channels"]
+
+    datalogger.publisher(topic="", values={"O3": Reading(17.5, "PPB")})
+    datalogger.publish_data()
+    payload = mocker.client_instance.publish.call_args.kwargs["payload"]
+    [(ts, valores)] = codec.decode(payload)
+    assert valores == {"O3": 17.5}
+
+    datalogger.publisher(topic="", values={"CO": 2.5})
+    datalogger.publish_data()
+    nbirth, ndata = mocker.client_instance.publish.call_args_list[-2:]
+    codec = NdataCodec.from_schema(json.loads(nbirth.kwargs["payload"])["schema"])
+    assert codec.decode(ndata.kwargs["payload"])[0][1] == {"CO": 2.5}
+
+
+def test_publicar_ndata_por_excepcion(mocker: MockerFixture, tmp_path):
+    with open(CONFIG_FILE) as archivo:
+        config = yaml.safe_load(archivo)
+    config["deadband"] = {"absolute": 0.5, "max_silence": 600}
+    archivo = tmp_path / "config.yaml"
+    archivo.write_text(yaml.safe_dump(config))
+
+    datalogger = Datalogger(config=str(archivo))
+    datalogger.publisher(topic="", values={"O3": 17.8, "EXT1": 1.5})
+    datalogger.publish_data()
+    payload = json.loads(mocker.client_instance.publish.call_args.kwargs["payload"])
+    assert (payload["O3"], payload["EXT1"]) == (17.8, 1.5)
+
+    mocker.client_instance.publish.reset_mock()
+    datalogger.publisher(topic="", values={"O3": 17.9, "EXT1": 1.5})
+    datalogger.publish_data()
+    assert mocker.client_instance.publish.call_count == 0
+
+    datalogger.publisher(topic="", values={"O3": 18.5, "EXT1": 1.5})
+    datalogger.publish_data()
+    payload = json.loads(mocker.client_instance.publish.call_args.kwargs["payload"])
+    assert "EXT1" not in payload and payload["O3"] == 18.5
+
+
+def registro_de_log(mensaje: str, nivel=logging.WARNING, nombre="analyzers"):
+    return logging.LogRecord(nombre, nivel, __file__, 1, mensaje, None, None)
+
+
+def test_limitar_la_tasa_de_mensajes_de_log(reloj):
+    cliente = MagicMock()
+    handler = MqttHandler(cliente, "V0/NLOG/mac", rate=2, burst=3, clock=reloj)
+    for indice in range(6):
+        handler.emit(registro_de_log(f"Mensaje {indice}"))
+
+    assert handler.publish_pending() == pytest.approx(0.5)
+    assert cliente.publish.call_count == 3
+    reloj.ahora = 1
+    assert handler.publish_pending() == pytest.approx(0.5)
+    assert cliente.publish.call_count == 5
+    reloj.ahora = 1.5
+    assert handler.publish_pending() == 0
+    assert [c.kwargs["payload"] for c in cliente.publish.call_args_list] == [
+        f"Mensaje {indice}" for indice in range(6)
+    ]
+
+
+def test_agrupar_mensajes_de_log_repetidos(reloj):
+    cliente = MagicMock()
+    handler = MqttHandler(cliente, "V0/NLOG/mac", clock=reloj)
+    for _ in range(50):
+        handler.emit(registro_de_log("No responde el puerto /dev/ttyUSB0"))
+        handler.emit(registro_de_log("Trama invalida", logging.ERROR))
+    handler.publish_pending()
+
+    assert cliente.publish.call_args_list == [
+        call(
+            topic="V0/NLOG/mac",
+            payload="No responde el puerto /dev/ttyUSB0 (repetido 50 veces)",
+        ),
+        call(topic="V0/NLOG/mac", payload="Trama invalida (repetido 50 veces)"),
+    ]
+    assert handler.collapsed == 98
+
+    handler.emit(registro_de_log("No responde el puerto /dev/ttyUSB0"))
+    handler.publish_pending()
+    assert cliente.publish.call_args.kwargs["payload"] == (
+        "No responde el puerto /dev/ttyUSB0"
     )
+
+
+def test_descartar_mensajes_de_log_con_la_cola_llena(reloj):
+    cliente = MagicMock()
+    handler = MqttHandler(cliente, "V0/NLOG/mac", size=4, clock=reloj)
+    for indice in range(10):
+        handler.emit(registro_de_log(f"Mensaje {indice}"))
+    handler.publish_pending()
+
+    assert handler.dropped == 6
+    assert [c.kwargs["payload"] for c in cliente.publish.call_args_list] == [
+        f"Mensaje {indice}" for indice in range(4)
+    ]
+
+
+def test_publicar_el_log_desde_un_hilo_propio():
+    liberar = threading.Event()
+    cliente = MagicMock()
+    cliente.publish.side_effect = lambda **kwargs: liberar.wait(5)
+    handler = MqttHandler(cliente, "V0/NLOG/mac", size=2)
+    handler.start()
+
+    inicio = time.monotonic()
+    for indice in range(20):
+        handler.emit(registro_de_log(f"Mensaje {indice}"))
+    assert time.monotonic() - inicio < 1
+    liberar.set()
+    handler.stop(timeout=5)
+
+    assert handler.sent + handler.dropped == 20
+    assert handler.dropped >= 17
+
+
+def test_codificar_ndata_encolado_con_el_esquema_vigente(
+    mocker: MockerFixture, tmp_path
+):
+    with open(CONFIG_FILE) as archivo:
+        config = yaml.safe_load(archivo)
+    config["mqtt"]["encoding"] = "binary"
+    config["mqtt"]["queue"] = {"dir": str(tmp_path / "queue"), "rate": 0}
+    archivo = tmp_path / "config.yaml"
+    archivo.write_text(yaml.safe_dump(config))
+
+    datalogger = Datalogger(config=str(archivo))
+    datalogger.start()
+    mocker.client_instance.is_connected.return_value = False
+    datalogger.publisher(topic="", values={"O3": 17.5})
+    datalogger.publish_data()
+    datalogger.publisher(topic="", values={"CO": 2.5})
+    datalogger.publish_data()
+
+    mocker.client_instance.is_connected.return_value = True
+    datalogger._drain()
+    mensajes = [
+        (c.kwargs["topic"].split("/")[1], c.kwargs["payload"])
+        for c in mocker.client_instance.publish.call_args_list
+    ]
+    assert [topic for topic, _ in mensajes] == ["NBIRTH", "NDATA", "NBIRTH", "NDATA"]
+    codec = NdataCodec.from_schema(json.loads(mensajes[0][1])["schema"])
+    assert codec.decode(mensajes[1][1])[0][1] == {"O3": 17.5}
+    codec = NdataCodec.from_schema(json.loads(mensajes[2][1])["schema"])
+    assert codec.decode(mensajes[3][1])[0][1] == {"CO": 2.5}
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import math
+
+from deadband import ReportByException
+
+
+def test_reportar_solo_cambios_mayores_a_la_banda_absoluta(reloj):
+    filtro = ReportByException(absolute=0.5, max_silence=600, clock=reloj)
+    assert filtro.filter({"P": 967.8, "T": 24.1}) == {"P": 967.8, "T": 24.1}
+    assert filtro.filter({"P": 968.2, "T": 24.7}) == {"T": 24.7}
+    assert filtro.filter({"P": 968.4, "T": 24.7}) == {"P": 968.4}
+    assert (filtro.reported, filtro.suppressed) == (4, 2)
+
+
+def test_reportar_cambios_mayores_a_la_banda_relativa(reloj):
+    filtro = ReportByException(relative=0.01, clock=reloj)
+    filtro.filter({"O3": 100.0})
+    assert filtro.filter({"O3": 100.9}) == {}
+    assert filtro.filter({"O3": 98.9}) == {"O3": 98.9}
+
+
+def test_usar_la_mayor_banda_y_los_ajustes_por_canal(reloj):
+    filtro = ReportByException(
+        absolute=1.0,
+        relative=0.1,
+        channels={"EXT1": {"absolute": 0.01, "relative": 0}},
+        clock=reloj,
+    )
+    filtro.filter({"O3": 50.0, "EXT1": 1.0})
+    assert filtro.filter({"O3": 54.0, "EXT1": 1.02}) == {"EXT1": 1.02}
+    assert filtro.filter({"O3": 55.5}) == {"O3": 55.5}
+
+
+def test_reportar_cuando_un_canal_pasa_a_nan_o_sale_de_nan(reloj):
+    filtro = ReportByException(absolute=10, clock=reloj)
+    filtro.filter({"PM10": 9.2})
+    [(canal, valor)] = filtro.filter({"PM10": math.nan}).items()
+    assert canal == "PM10" and math.isnan(valor)
+    assert filtro.filter({"PM10": math.nan}) == {}
+    assert filtro.filter({"PM10": 9.3}) == {"PM10": 9.3}
+
+
+def test_reportar_al_vencer_el_silencio_maximo(reloj):
+    filtro = ReportByException(
+        absolute=1, max_silence=600, channels={"P": {"max_silence": 60}}, clock=reloj
+    )
+    filtro.filter({"T": 20.0, "P": 967.0})
+    reloj.ahora = 59
+    assert filtro.filter({"T": 20.0, "P": 967.0}) == {}
+    reloj.ahora = 60
+    assert filtro.filter({"T": 20.0, "P": 967.0}) == {"P": 967.0}
+    reloj.ahora = 100
+    assert filtro.filter({"T": 20.0, "P": 967.0}) == {}
+    reloj.ahora = 600
+    assert filtro.filter({"T": 20.0, "P": 967.0}) == {"T": 20.0, "P": 967.0}
+    assert str(filtro) == "canales=2 reportados=5 suprimidos=5 (50.0%)"
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+
+from health import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def test_abrir_despues_de_polls_vacios_consecutivos(reloj):
+    breaker = CircuitBreaker(threshold=3, backoff=30, max_backoff=100, clock=reloj)
+    assert breaker.record(False) is None
+    assert breaker.record(True) is None
+    assert breaker.record(False) is None
+    assert breaker.record(False) is None
+    assert breaker.record(False) == OPEN
+    assert not breaker.allow()
+    assert breaker.retry_in == 30
+
+    reloj.ahora = 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert breaker.record(False) == OPEN
+    assert breaker.delay == 60
+
+    reloj.ahora = 90
+    assert breaker.allow()
+    assert breaker.record(False) == OPEN
+    assert breaker.delay == 100
+
+    reloj.ahora = 190
+    assert breaker.allow()
+    assert breaker.record(True) == CLOSED
+    assert breaker.failures == 0
+    assert breaker.allow()
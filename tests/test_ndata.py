@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import json
+import pytest
+
+from ndata import NdataCodec
+
+COLUMNAS = ["O3", "SO2", "NO2", "NO", "NOx", "TSP", "PM10", "PM25", "PM1"]
+
+
+def test_codificar_y_decodificar_muestras():
+    codec = NdataCodec(COLUMNAS, double=True)
+    muestras = [
+        (1700000000, {"O3": 17.8, "PM10": 9.2}),
+        (1700000060, {"SO2": 3.51, "O3": 18.1, "PM1": 4.0}),
+        (1700000120, {}),
+    ]
+    payload = codec.encode(muestras)
+    assert NdataCodec.from_schema(codec.schema()).decode(payload) == muestras
+
+
+def test_codificar_en_precision_simple():
+    codec = NdataCodec(COLUMNAS)
+    valores = {column: indice + 0.1 for indice, column in enumerate(COLUMNAS)}
+    payload = codec.encode([(1700000000, valores)])
+    [(ts, decodificados)] = codec.decode(payload)
+
+    assert ts == 1700000000
+    assert decodificados == pytest.approx(valores)
+    assert len(payload) < len(json.dumps(valores)) / 2
+
+
+def test_anunciar_un_nuevo_esquema_al_agregar_canales():
+    codec = NdataCodec(COLUMNAS)
+    anterior = NdataCodec.from_schema(codec.schema())
+
+    assert not codec.add_channels(["O3", "SO2"])
+    assert codec.add_channels(["Meteo", "O3"])
+    assert codec.schema()["channels"]["Meteo"] == len(COLUMNAS)
+
+    payload = codec.encode([(1700000000, {"Meteo": 1.5})])
+    with pytest.raises(ValueError):
+        anterior.decode(payload)
+    assert NdataCodec.from_schema(codec.schema()).decode(payload) == [
+        (1700000000, {"Meteo": 1.5})
+    ]
+
+
+def test_rechazar_canales_fuera_del_esquema():
+    codec = NdataCodec(COLUMNAS)
+    with pytest.raises(ValueError):
+        codec.encode([(1700000000, {"CO": 1.0})])
+    with pytest.raises(ValueError):
+        codec.encode([(1700000060, {}), (1700000000, {})])
+
+
+def test_distinguir_esquemas_cuando_la_secuencia_da_la_vuelta():
+    codec = NdataCodec(COLUMNAS, seq=255)
+    anterior = NdataCodec.from_schema(codec.schema())
+    codec.add_channels(["Meteo"])
+    codec.seq = 255
+
+    with pytest.raises(ValueError):
+        anterior.decode(codec.encode([(1700000000, {"O3": 1.0})]))
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import os
+import time
+import socket
+import threading
+
+from readers import FrameBuffer, IOLoop, LineFramer, SerialReader, TcpLink
+from unittest.mock import MagicMock
+
+
+class FakePort:
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+        self.in_waiting = 0
+
+    def read(self, size=1):
+        if self._chunks:
+            return self._chunks.pop(0)
+        time.sleep(0.01)
+        return b""
+
+
+def test_entregar_solo_tramas_completas():
+    lector = SerialReader(MagicMock(), "O3", size=4)
+    lector.feed(b"14-00-01 23:04  M000  O3   17.8  PPB\r\n14-00-01 23:05  M0")
+    lector.feed(b"00  O3   18.1  PPB\r\n14-00-01 23:06  M000  O3 ")
+
+    assert lector.latest() == "14-00-01 23:05  M000  O3   18.1  PPB"
+    assert lector.latest() == ""
+
+    lector.feed(b"  18.4  PPB\r\n")
+    assert lector.latest() == "14-00-01 23:06  M000  O3   18.4  PPB"
+
+
+def test_conservar_las_ultimas_tramas():
+    lector = SerialReader(MagicMock(), "O3", size=3)
+    lector.feed(b"".join(f"trama {i}\r\n".encode() for i in range(10)))
+
+    tramas = lector.frames()
+    assert [texto for _, texto in tramas] == ["trama 7", "trama 8", "trama 9"]
+    assert lector.frames() == []
+
+
+def test_descartar_tramas_viejas_y_lineas_sin_fin():
+    lector = SerialReader(MagicMock(), "O3", stale_after=0.05, max_line=16)
+    lector.feed(b"trama vieja\r\n")
+    time.sleep(0.1)
+    assert lector.latest() == ""
+
+    lector.feed(b"x" * 32)
+    lector.feed(b"fin\r\n")
+    assert lector.latest() == "fin"
+
+
+def test_leer_el_puerto_en_segundo_plano():
+    lector = SerialReader(
+        FakePort([b"07-09-23 16:41  M000 SO2", b"  3.510 PPB\r\n"]), "SO2"
+    )
+    lector.start()
+    limite = time.monotonic() + 2
+    while not lector._frames and time.monotonic() < limite:
+        time.sleep(0.01)
+    lector.stop()
+
+    assert lector.latest() == "07-09-23 16:41  M000 SO2  3.510 PPB"
+
+
+class PipePort:
+    """Puerto serie simulado sobre un pipe, seleccionable por su descriptor."""
+
+    def __init__(self):
+        self._r, self._w = os.pipe()
+
+    def fileno(self):
+        return self._r
+
+    @property
+    def in_waiting(self):
+        return 0
+
+    def read(self, size=1):
+        return os.read(self._r, max(size, 4096))
+
+    def write(self, data):
+        os.write(self._w, data)
+
+    def close(self):
+        os.close(self._r)
+        os.close(self._w)
+
+
+def esperar(condicion, limite=2.0):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if condicion():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_multiplexar_puertos_serie_en_un_hilo():
+    loop = IOLoop()
+    puertos = [PipePort(), PipePort()]
+    lectores = [SerialReader(p, f"equipo {i}") for i, p in enumerate(puertos)]
+    for lector in lectores:
+        lector.attach(loop)
+    loop.start()
+    try:
+        puertos[0].write(b"O3 17.8\r\nO3 ")
+        puertos[1].write(b"SO2 3.1\r\n")
+        puertos[0].write(b"18.1\r\n")
+
+        recibidas = [[], []]
+
+        def completas():
+            for i, lector in enumerate(lectores):
+                recibidas[i] += [texto for _, texto in lector.frames()]
+            return len(recibidas[0]) == 2 and len(recibidas[1]) == 1
+
+        assert esperar(completas)
+        assert recibidas == [["O3 17.8", "O3 18.1"], ["SO2 3.1"]]
+        assert lectores[0]._thread is None
+    finally:
+        loop.stop()
+        for puerto in puertos:
+            puerto.close()
+
+
+def test_reconectar_el_enlace_tcp():
+    servidor = socket.socket()
+    servidor.bind(("127.0.0.1", 0))
+    servidor.listen()
+    servidor.settimeout(2)
+    host, port = servidor.getsockname()
+
+    loop = IOLoop()
+    tramas = FrameBuffer("Grimm")
+    enlace = TcpLink(loop, host, port, tramas, "Grimm", handshake=b"\x05", backoff=0.05)
+    loop.start()
+    enlace.start()
+    try:
+        conexion, _ = servidor.accept()
+        assert conexion.recv(1) == b"\x05"
+        conexion.sendall(b"P 1 2\r\nN_ 17.2\r\n")
+        assert esperar(lambda: enlace.connected)
+        recibidas = []
+        assert esperar(lambda: recibidas.extend(tramas.frames()) or len(recibidas) == 2)
+        assert [texto for _, texto in recibidas] == ["P 1 2", "N_ 17.2"]
+
+        conexion.close()
+        conexion, _ = servidor.accept()
+        assert conexion.recv(1) == b"\x05"
+        conexion.sendall(b"N_ 18.0\r\n")
+        assert esperar(lambda: tramas.latest() == "N_ 18.0")
+        conexion.close()
+    finally:
+        enlace.close()
+        loop.stop()
+        servidor.close()
+
+
+def test_separar_lineas_partidas_entre_fragmentos():
+    separador = LineFramer(b"\r\n")
+    separador.feed(b"N_ 17.2\r")
+    assert list(separador.lines()) == []
+    separador.feed(b"\nP 1 2\r\nN_")
+    assert list(separador.lines()) == [b"N_ 17.2", b"P 1 2"]
+    separador.feed(b" 18.0\r\n")
+    assert list(separador.lines()) == [b"N_ 18.0"]
+    assert len(separador) == 0
+
+
+def test_limitar_el_buffer_de_recepcion():
+    separador = LineFramer(b"\r\n", max_size=64)
+    separador.feed(b"N_ 17.2\r\n" + b"x" * 100)
+    assert separador.overflows == 1
+    assert separador.dropped_bytes == 100
+    assert list(separador.lines()) == [b"N_ 17.2"]
+
+    separador.feed(b"N_ 18.0\r\n")
+    assert list(separador.lines()) == [b"N_ 18.0"]
+
+
+def test_resolver_el_nombre_fuera_del_loop(monkeypatch):
+    original = socket.getaddrinfo
+    hilos = []
+
+    def lento(*args, **kwargs):
+        hilos.append(threading.current_thread().name)
+        time.sleep(0.5)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", lento)
+    loop = IOLoop()
+    enlace = TcpLink(loop, "127.0.0.1", 9, FrameBuffer("Grimm"), "Grimm")
+    loop.start()
+    try:
+        enlace.start()
+        time.sleep(0.05)
+        atendido = []
+        inicio = time.monotonic()
+        loop.call_soon(lambda: atendido.append(time.monotonic() - inicio))
+        assert esperar(lambda: atendido)
+        assert atendido[0] < 0.2
+        assert hilos and hilos[0] != "IOLoop"
+    finally:
+        enlace.close()
+        loop.stop()
+
+
+class PuertoQueSeCae(PipePort):
+    """Puerto que falla en la primera lectura y se recupera al reabrirlo."""
+
+    def __init__(self):
+        super().__init__()
+        self.fallar = True
+
+    def read(self, size=1):
+        if self.fallar:
+            self.fallar = False
+            raise OSError("el dispositivo se desconectó")
+        return super().read(size)
+
+    def open(self):
+        self._r, self._w = os.pipe()
+
+
+def test_reabrir_el_puerto_serie_tras_un_error():
+    loop = IOLoop()
+    puerto = PuertoQueSeCae()
+    lector = SerialReader(puerto, "SO2", reopen_after=0.01)
+    lector.attach(loop)
+    loop.start()
+    try:
+        puerto.write(b"basura")
+        assert esperar(lambda: not puerto.fallar)
+        time.sleep(0.1)
+        puerto.write(b"SO2 3.1\r\n")
+        assert esperar(lambda: lector.latest() == "SO2 3.1")
+    finally:
+        lector.stop()
+        loop.stop()
+        puerto.close()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import time
+import asyncio
+
+from scheduler import Scheduler
+
+
+def test_alinear_ticks_al_reloj():
+    planificador = Scheduler(clock=lambda: 1000003.7)
+    assert planificador.next_tick(10) == 1000010
+    assert planificador.next_tick(60, offset=5) == 1000025
+    assert planificador.next_tick(3600) == 1000800
+
+
+def test_ejecutar_tareas_sin_deriva():
+    ejecuciones = []
+    planificador = Scheduler()
+    planificador.every(
+        "lenta", 0.1, lambda: (ejecuciones.append(time.time()), time.sleep(0.03))
+    )
+
+    async def ejecutar():
+        try:
+            await asyncio.wait_for(planificador.main(), timeout=0.55)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(ejecutar())
+
+    assert len(ejecuciones) >= 4
+    for ejecucion in ejecuciones:
+        assert (ejecucion + 0.02) % 0.1 < 0.07
+    metricas = planificador.metrics["lenta"]
+    assert metricas.ticks == len(ejecuciones)
+    assert metricas.skipped == 0
+    assert metricas.max < 0.05
+
+
+def test_omitir_ticks_vencidos():
+    planificador = Scheduler()
+    planificador.every("bloqueada", 0.05, lambda: time.sleep(0.12))
+
+    async def ejecutar():
+        try:
+            await asyncio.wait_for(planificador.main(), timeout=0.4)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(ejecutar())
+
+    assert planificador.metrics["bloqueada"].skipped >= 2
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import os
+
+from spool import SegmentQueue
+
+
+def test_encolar_y_confirmar_mensajes(tmp_path):
+    cola = SegmentQueue(str(tmp_path), segment_size=64)
+    for indice in range(10):
+        cola.push("V0/NDATA/mac", f'{{"O3": {indice}}}')
+
+    mensajes = cola.peek(4)
+    assert [payload for _, payload, _ in mensajes] == [
+        b'{"O3": 0}',
+        b'{"O3": 1}',
+        b'{"O3": 2}',
+        b'{"O3": 3}',
+    ]
+    assert mensajes[0][0] == "V0/NDATA/mac"
+    assert cola.peek(4) == mensajes
+
+    cola.commit(mensajes[-1][2])
+    cola.close()
+
+    cola = SegmentQueue(str(tmp_path), segment_size=64)
+    restantes = cola.peek(100)
+    assert [payload for _, payload, _ in restantes][0] == b'{"O3": 4}'
+    assert len(restantes) == 6
+
+
+def test_borrar_segmentos_consumidos(tmp_path):
+    cola = SegmentQueue(str(tmp_path), segment_size=64)
+    for indice in range(10):
+        cola.push("V0/NDATA/mac", f'{{"O3": {indice}}}')
+    segmentos = len([a for a in os.listdir(tmp_path) if a.endswith(".seg")])
+    assert segmentos > 1
+
+    cola.commit(cola.peek(100)[-1][2])
+    assert len([a for a in os.listdir(tmp_path) if a.endswith(".seg")]) == 1
+    assert cola.peek(100) == []
+
+
+def test_descartar_segmentos_viejos_con_cola_llena(tmp_path):
+    cola = SegmentQueue(str(tmp_path), segment_size=64, max_bytes=128)
+    for indice in range(50):
+        cola.push("V0/NDATA/mac", f'{{"O3": {indice}}}')
+
+    assert cola.size <= 128 + 64
+    mensajes = cola.peek(100)
+    assert mensajes[-1][1] == b'{"O3": 49}'
+    assert mensajes[0][1] != b'{"O3": 0}'
+
+
+def test_reparar_el_ultimo_segmento_tras_una_caida(tmp_path):
+    cola = SegmentQueue(str(tmp_path))
+    cola.push("V0/NDATA/mac", '{"O3": 0}')
+    cola.push("V0/NDATA/mac", '{"O3": 1}')
+    cola.close()
+    segmento = tmp_path / f"{0:012d}.seg"
+    with open(segmento, "ab") as archivo:
+        archivo.write(b"\x0c\x00\x40")
+
+    cola = SegmentQueue(str(tmp_path))
+    cola.push("V0/NDATA/mac", '{"O3": 2}')
+    assert [payload for _, payload, _ in cola.peek(10)] == [
+        b'{"O3": 0}',
+        b'{"O3": 1}',
+        b'{"O3": 2}',
+    ]
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import socket
+import http.client
+
+from analyzers import WeatherUnderground
+from webserver import HttpServer, Request
+
+UPDATE = (
+    "/weatherstation/updateweatherstation.php?ID=KEALAB&PASSWORD=clave"
+    "&tempf=50&humidity=61&baromin=29.92&action=updateraw"
+)
+
+
+def estacion(**kwargs):
+    return WeatherUnderground(
+        "Meteo",
+        port=0,
+        publisher=None,
+        topic="",
+        station_id="KEALAB",
+        password="clave",
+        bind="127.0.0.1",
+        **kwargs,
+    )
+
+
+def test_recibir_updates_con_keep_alive():
+    meteo = estacion()
+    try:
+        conexion = http.client.HTTPConnection("127.0.0.1", meteo._server.port)
+        conexion.request("GET", UPDATE)
+        respuesta = conexion.getresponse()
+        assert respuesta.status == 200
+        assert respuesta.read() == b"success\n"
+        assert respuesta.getheader("Connection") == "keep-alive"
+
+        # Firmware EasyWeather: los parámetros pegados al path sin el "?".
+        conexion.request("GET", UPDATE.replace("?", "").replace("tempf=50", "tempf=68"))
+        assert conexion.getresponse().read() == b"success\n"
+        assert meteo._server.connections == 1
+
+        conexion.request("GET", UPDATE.replace("KEALAB", "OTRA"))
+        respuesta = conexion.getresponse()
+        assert respuesta.status == 401
+        assert respuesta.read() == b"bad station id\n"
+        conexion.close()
+
+        values = meteo._get_values()
+        assert values["MeteoTempOut"] == 15.0
+        assert values["MeteoRHOut"] == 61.0
+    finally:
+        meteo.close()
+
+
+def test_limitar_las_conexiones_simultaneas():
+    servidor = HttpServer(
+        "127.0.0.1",
+        0,
+        lambda peticion: peticion.send_response(200),
+        name="prueba",
+        max_connections=1,
+        timeout=0.2,
+    )
+    servidor.start()
+    try:
+        ocupada = socket.create_connection(("127.0.0.1", servidor.port))
+        ocupada.sendall(b"GET / HTTP/1.1\r\nHost: x\r\n\r\n")
+        assert b"200 OK" in ocupada.recv(1024)
+
+        rechazada = http.client.HTTPConnection("127.0.0.1", servidor.port)
+        rechazada.request("GET", "/")
+        assert rechazada.getresponse().status == 503
+        assert servidor.rejected == 1
+        ocupada.close()
+    finally:
+        servidor.stop()
+
+
+def test_armar_la_respuesta_de_un_handler():
+    peticion = Request("GET", "/", "HTTP/1.0", {}, ("127.0.0.1", 1))
+    peticion.send_response(401)
+    peticion.end_headers()
+    peticion.wfile.write(b"bad password\n")
+    assert not peticion.keep_alive
+    assert peticion.response(False) == (
+        b"HTTP/1.1 401 Unauthorized\r\nContent-Length: 13\r\n"
+        b"Connection: close\r\n\r\nbad password\n"
+    )